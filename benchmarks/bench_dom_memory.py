@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document import Document
+
+def synthetic_page(rows):
+    # ~10 nodes per row: a mix of elements with and without attributes plus text
+    body = ''.join(
+        f'<div class="row r{i}" id="row{i}"><span>{i}</span><a href="/item/{i}">item</a><ul><li>a</li><li>b</li></ul></div>'
+        for i in range(rows)
+    )
+    return f'<html><head><title>bench</title></head><body>{body}</body></html>'
+
+def walk(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.childNodes)
+    return count
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    keep, count = build()
+    elapsed = time.perf_counter() - start
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count, count, elapsed, keep
+
+def parsed_tree(page):
+    document = Document({}, 'https://www.example.com/', page)
+    document._soup
+    def build():
+        return document, walk(document)
+    return build
+
+def created_tree(count):
+    document = Document({}, 'https://www.example.com/', '<html><body></body></html>')
+    def build():
+        parent = document.body
+        for i in range(count):
+            element = document.createElement('div')
+            element.setAttribute('class', 'row')
+            element.appendChild(document.createTextNode(str(i)))
+            parent.appendChild(element)
+        return document, count * 2
+    return build
+
+def bench(rows=5000):
+    page = synthetic_page(rows)
+    per_node, count, elapsed, _ = measure(parsed_tree(page))
+    print(f'parsed page  nodes={count:<7} {per_node:7.1f} bytes/node  wrap {elapsed:.2f}s')
+
+    per_node, count, elapsed, _ = measure(created_tree(rows * 5))
+    print(f'created tree nodes={count:<7} {per_node:7.1f} bytes/node  build {elapsed:.2f}s')
+
+if __name__ == '__main__':
+    bench()
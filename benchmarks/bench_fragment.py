@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document import Document, get_parser
+
+# the kind of markup scripts build from templates and assign to innerHTML
+CARD = (
+    '<div class="card" data-id="{i}"><img src="/img/{i}.png" alt="item {i}">'
+    '<h3 class="title">Item {i} &amp; more</h3><p>Price: <b>{i}.99</b><br>In stock</p>'
+    '<ul><li>red<li>green<li>blue</ul><a href="/buy?id={i}&amp;q=1" onclick="buy({i})">Buy</a></div>'
+)
+
+def fragment(size):
+    parts = []
+    total = 0
+    i = 0
+    while total < size:
+        card = CARD.format(i=i)
+        parts.append(card)
+        total += len(card)
+        i += 1
+    return ''.join(parts)
+
+def walk(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.childNodes)
+    return count
+
+def bs4_fragment(document, markup):
+    # what the innerHTML setter used to do: a full bs4 parse, then wrapping every node
+    soup = get_parser('html.parser')(markup)
+    nodes = [node for node in (document._wrap(child) for child in soup.children) if node is not None]
+    return sum(walk(node) for node in nodes)
+
+def streaming_fragment(document, markup):
+    element = document.createElement('div')
+    element.innerHTML = markup
+    return walk(element) - 1
+
+def timed(func, runs):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        nodes = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, nodes
+
+def bench(sizes=(1024, 100 * 1024, 1024 * 1024)):
+    document = Document({}, 'https://www.example.com/', '<html><body></body></html>')
+    for size in sizes:
+        markup = fragment(size)
+        runs = 50 if size < 10000 else 5 if size < 500000 else 2
+        old, old_nodes = timed(lambda: bs4_fragment(document, markup), runs)
+        new, new_nodes = timed(lambda: streaming_fragment(document, markup), runs)
+
+        print(
+            f'{len(markup) / 1024:7.0f} KB  bs4 {old * 1000:9.2f}ms ({old_nodes} nodes)  '
+            f'streaming {new * 1000:9.2f}ms ({new_nodes} nodes)  {old / new:5.1f}x'
+        )
+
+if __name__ == '__main__':
+    bench()
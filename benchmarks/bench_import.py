@@ -0,0 +1,53 @@
+import os
+import re
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('esprima', 'numpy', 'quickjs', 'bs4', 'uaparser', 'cryptography')
+
+SNIPPETS = {
+    'import interpreter': 'import interpreter',
+    'import + window': (
+        'from environment import init_globalEnv\n'
+        "init_globalEnv(domain='https://www.example.com/', user_agent='Mozilla/5.0', html='')"
+    ),
+    'import + window + parse': (
+        'from interpreter import JSInterpreter\n'
+        'from environment import init_globalEnv\n'
+        "ctx = init_globalEnv(domain='https://www.example.com/', user_agent='Mozilla/5.0', html='')\n"
+        "code = 'var a = 1 + 2;'\n"
+        'JSInterpreter(code, exec_ctx=ctx).evaluate(JSInterpreter.parse_code(code))'
+    ),
+}
+
+def importtime(snippet):
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', snippet],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stderr
+
+    total = 0
+    loaded = []
+    for line in output.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)', line)
+        if not match:
+            continue
+
+        cumulative, indent, name = int(match.group(1)), match.group(2), match.group(3)
+        if not indent:
+            total += cumulative
+        if name in HEAVY_MODULES:
+            loaded.append(name)
+    return total, loaded
+
+def bench(runs=5):
+    for label, snippet in SNIPPETS.items():
+        results = [importtime(snippet) for _ in range(runs)]
+        best = min(total for total, _ in results)
+        loaded = ', '.join(results[0][1]) or 'none'
+
+        print(f'{label:<26} {best / 1000:8.1f}ms  heavy modules imported: {loaded}')
+
+if __name__ == '__main__':
+    bench()
@@ -0,0 +1,36 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from runner import run_many
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36'
+SCRIPT = """
+function mul(x) {
+    return 10 * x;
+};
+
+var array = [];
+for (let i = 0; i < 200; i++) {
+    array.push(mul(i));
+};
+array.length;
+"""
+
+def bench(jobs_count=64, worker_counts=(1, 2, 4, 8)):
+    jobs = [(SCRIPT, 'https://www.example.com/', USER_AGENT, '')] * jobs_count
+    base = None
+
+    for workers in worker_counts:
+        start = time.perf_counter()
+        run_many(jobs, workers=workers)
+        elapsed = time.perf_counter() - start
+        base = base or elapsed
+
+        print(f'workers={workers:<2} jobs={jobs_count} {elapsed:.2f}s {jobs_count / elapsed:.1f} jobs/s speedup={base / elapsed:.2f}x')
+
+if __name__ == '__main__':
+    print(f'cpu count: {os.cpu_count()}')
+    bench()
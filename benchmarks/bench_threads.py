@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interpreter import JSInterpreter
+from environment import init_globalEnv
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36'
+PRELOAD = """
+function mul(x) {
+    return 10 * x;
+};
+"""
+SCRIPT = """
+var array = [];
+for (let i = 0; i < 200; i++) {
+    array.push(mul(i));
+};
+array.length;
+"""
+
+def _worker(template, ast, runs, results):
+    for _ in range(runs):
+        interpreter = JSInterpreter(SCRIPT, exec_ctx=template.clone())
+        results.append(interpreter.evaluate(ast))
+
+def bench(runs_per_thread=16, thread_counts=(1, 2, 4, 8)):
+    ctx = init_globalEnv(domain='https://www.example.com/', user_agent=USER_AGENT, html='')
+    JSInterpreter(PRELOAD, exec_ctx=ctx).evaluate(JSInterpreter.parse_code(PRELOAD))
+    template = ctx.snapshot()
+    ast = JSInterpreter.parse_code(SCRIPT)
+    base = None
+
+    for count in thread_counts:
+        results = []
+        threads = [threading.Thread(target=_worker, args=(template, ast, runs_per_thread, results)) for _ in range(count)]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        runs = count * runs_per_thread
+        assert results == [200] * runs, results
+        throughput = runs / elapsed
+        base = base or throughput
+
+        print(f'threads={count:<2} runs={runs:<4} {elapsed:.2f}s {throughput:.1f} runs/s scaling={throughput / base:.2f}x')
+
+if __name__ == '__main__':
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f'python {sys.version.split()[0]} gil={"enabled" if gil else "disabled"} cpu count: {os.cpu_count()}')
+    bench()
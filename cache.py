@@ -0,0 +1,157 @@
+import time
+import pickle
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+RESULT_CACHE_SIZE = 1024
+
+
+def env_fingerprint(window, *extra):
+    html = hashlib.sha1(window._html_code.encode('utf-8', 'surrogatepass')).hexdigest()
+    profile = tuple(window.profile) if window.profile is not None else None
+    return hashlib.sha1(repr((window.domain, window.user_Agent, html, profile, extra)).encode()).hexdigest()
+
+class MemoryBackend:
+    def __init__(self, max_size=RESULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires = entry
+            if expires is not None and expires < time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires=None):
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        return {'max_size': self.max_size, '_entries': OrderedDict(self._entries)}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+class SqliteBackend:
+    # shared between processes through the file, workers of run_many all see the same entries
+    def __init__(self, path, max_size=RESULT_CACHE_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB, expires REAL, used REAL)'
+            )
+        return self._conn
+
+    def get(self, key):
+        with self._lock:
+            row = self.conn.execute('SELECT value, expires FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+
+            value, expires = row
+            if expires is not None and expires < time.time():
+                self.conn.execute('DELETE FROM results WHERE key = ?', (key,))
+                return None
+
+            self.conn.execute('UPDATE results SET used = ? WHERE key = ?', (time.time(), key))
+            return pickle.loads(value)
+
+    def set(self, key, value, expires=None):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO results (key, value, expires, used) VALUES (?, ?, ?, ?)',
+                (key, data, expires, time.time())
+            )
+            self.conn.execute(
+                'DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)',
+                (self.max_size,)
+            )
+
+    def delete(self, key):
+        with self._lock:
+            self.conn.execute('DELETE FROM results WHERE key = ?', (key,))
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute('DELETE FROM results')
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __getstate__(self):
+        return {'path': self.path, 'max_size': self.max_size}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._conn = None
+        self._lock = threading.Lock()
+
+class ResultCache:
+    def __init__(self, backend=None, ttl=None):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(ast_hash, fingerprint, seed=None):
+        return hashlib.sha1(repr((ast_hash, fingerprint, seed)).encode()).hexdigest()
+
+    def get(self, key):
+        output = self.backend.get(key)
+        if output is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return output
+
+    def put(self, key, output):
+        # runs that read entropy or the clock outside the seed, or failed, are never stored
+        if output['error'] is not None or output.get('nondeterministic'):
+            return False
+
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        self.backend.set(key, output, expires)
+        return True
+
+    def clear(self):
+        self.backend.clear()
@@ -1,7 +1,157 @@
-import re
-from bs4 import BeautifulSoup
+import html
+from host import HostObject, FrozenDict, script_running
+from selector import compile_selector
+from fragment import parse_fragment, VOID_ELEMENTS
+
+DEFAULT_PARSER = 'html.parser'
+PARSERS = {}
+RAW_TEXT_ELEMENTS = frozenset(('script', 'style'))
+INDEXED_ATTRIBUTES = ('id', 'class', 'name')
+
+# shared by every node that never got children, attributes or listeners of its own
+_NO_NODES = ()
+_NO_ATTRIBUTES = FrozenDict()
+
+def register_parser(name, parse):
+    # parse(html) has to return a bs4 tree, documents pick a backend by name with Document(parser=...)
+    PARSERS[name] = parse
+
+def _bs4_parser(features):
+    def parse(markup):
+        from bs4 import BeautifulSoup
+        return BeautifulSoup(markup, features)
+    return parse
+
+register_parser('html.parser', _bs4_parser('html.parser'))
+register_parser('lxml', _bs4_parser('lxml'))
+register_parser('html5lib', _bs4_parser('html5lib'))
+
+def get_parser(parser):
+    if callable(parser):
+        return parser
+    if parser not in PARSERS:
+        raise ValueError(f'Unknown html parser: {parser}')
+    return PARSERS[parser]
+    
+class EventListener:
+    __slots__ = ('callback', 'capture', 'once', 'passive', 'removed')
+    
+    def __init__(self, callback, capture=False, once=False, passive=False):
+        self.callback = callback
+        self.capture = capture
+        self.once = once
+        self.passive = passive
+        self.removed = False
+
+def _listener_options(options):
+    if isinstance(options, dict):
+        return bool(options.get('capture')), bool(options.get('once')), bool(options.get('passive'))
+    return bool(options), False, False
+
+class EventTarget(HostObject):
+    # listeners are kept per type in tuples that are replaced on change, a dispatch iterates them without copying
+    __slots__ = ()
+    
+    def addEventListener(self, event_type, callback, options=None):
+        if callback is None:
+            return
+        capture, once, passive = _listener_options(options)
+        if self._event_listeners is _NO_ATTRIBUTES:
+            self._event_listeners = {}
+            
+        listeners = self._event_listeners.get(event_type, ())
+        if any(listener.callback == callback and listener.capture == capture for listener in listeners):
+            return
+        self._event_listeners[event_type] = listeners + (EventListener(callback, capture, once, passive),)
+        
+    def removeEventListener(self, event_type, callback, options=None):
+        capture = _listener_options(options)[0]
+        listeners = self._event_listeners.get(event_type, ())
+        for listener in listeners:
+            if listener.callback == callback and listener.capture == capture:
+                listener.removed = True
+                remaining = tuple(other for other in listeners if other is not listener)
+                if remaining:
+                    self._event_listeners[event_type] = remaining
+                else:
+                    del self._event_listeners[event_type]
+                return
+            
+    def dispatchEvent(self, event):
+        return dispatch_event(self, event)
     
-class NodeType:
+    def _event_parent(self, event):
+        return None
+    
+    def _event_handler(self, event_type):
+        return getattr(self, 'on' + event_type, None)
+
+def _invoke_listeners(target, event, capture):
+    event.currentTarget = target
+    listeners = target._event_listeners.get(event.type)
+    if listeners:
+        for listener in listeners:
+            if listener.removed or listener.capture != capture:
+                continue
+            if listener.once:
+                target.removeEventListener(event.type, listener.callback, listener.capture)
+                
+            event._passive = listener.passive
+            listener.callback(event)
+            event._passive = False
+            if event._stopped_immediately:
+                return
+            
+    if not capture:
+        handler = target._event_handler(event.type)
+        if callable(handler):
+            handler(event)
+    
+def dispatch_event(target, event):
+    # the propagation path is computed once up front, later tree changes don't alter it
+    if isinstance(event, dict):
+        event = Event(event.get('type'), event)
+        
+    path = [target]
+    parent = target._event_parent(event)
+    while parent is not None:
+        path.append(parent)
+        parent = parent._event_parent(event)
+        
+    event.target = target
+    event._path = path
+    event._stopped = event._stopped_immediately = False
+    
+    event.eventPhase = Event.CAPTURING_PHASE
+    for node in reversed(path[1:]):
+        if event._stopped:
+            break
+        _invoke_listeners(node, event, True)
+        
+    if not event._stopped:
+        event.eventPhase = Event.AT_TARGET
+        _invoke_listeners(target, event, True)
+        if not event._stopped:
+            _invoke_listeners(target, event, False)
+        
+    if event.bubbles:
+        event.eventPhase = Event.BUBBLING_PHASE
+        for node in path[1:]:
+            if event._stopped:
+                break
+            _invoke_listeners(node, event, False)
+            
+    event.eventPhase = Event.NONE
+    event.currentTarget = None
+    event._path = []
+    
+    if not script_running():
+        window = path[-1]
+        if hasattr(window, 'perform_microtask_checkpoint'):
+            window.perform_microtask_checkpoint()
+    return not event.defaultPrevented
+
+class NodeType(EventTarget):
     ELEMENT_NODE = 1
     ATTRIBUTE_NODE = 2
     TEXT_NODE = 3
@@ -15,27 +165,444 @@ class NodeType:
     DOCUMENT_FRAGMENT_NODE = 11
     NOTATION_NODE = 12
     
+    # nodes are slotted to keep large pages small, '__dict__' stays for expando properties set by scripts
+    __slots__ = (
+        'nodeType', 'nodeName', '_child_nodes', 'parentNode', 'ownerDocument', '_event_listeners',
+        '_registrations', '_observer_cache', '__dict__'
+    )
+    
     def __init__(self, node_type=None, node_name=None):
         self.nodeType = node_type
         self.nodeName = node_name
-        self.children = []
+        self._child_nodes = _NO_NODES
         self.parentNode = None
+        self.ownerDocument = None
+        self._event_listeners = _NO_ATTRIBUTES
+        self._registrations = _NO_NODES
+        self._observer_cache = None
+        
+    @property
+    def childNodes(self):
+        if self._child_nodes is None:
+            self._child_nodes = self._wrap_children()
+        return self._child_nodes
+    
+    @property
+    def children(self):
+        return [node for node in self.childNodes if isinstance(node, Element)]
+    
+    @property
+    def firstChild(self):
+        nodes = self.childNodes
+        return nodes[0] if nodes else None
+    
+    @property
+    def lastChild(self):
+        nodes = self.childNodes
+        return nodes[-1] if nodes else None
+    
+    @property
+    def textContent(self):
+        return ''.join(node.textContent for node in self.childNodes)
+    
+    def _wrap_children(self):
+        if self._source is None:
+            return _NO_NODES
+        
+        document = self.ownerDocument or self
+        nodes = []
+        for child in self._source.children:
+            node = document._wrap(child)
+            if node is not None:
+                node.parentNode = self
+                nodes.append(node)
+        return nodes or _NO_NODES
+    
+    @property
+    def isConnected(self):
+        node = self
+        while node.parentNode is not None:
+            node = node.parentNode
+        return isinstance(node, Document)
+    
+    def _live_index(self):
+        # the index only follows nodes attached to a document that has built it
+        document = self if isinstance(self, Document) else self.ownerDocument
+        if document is None or document._dom_index is None or not self.isConnected:
+            return None
+        return document._dom_index
     
     def appendChild(self, node):
+        if node.parentNode is not None:
+            node.parentNode.removeChild(node)
+        previous = self.lastChild
         node.parentNode = self
-        self.childNodes.append(node)
+        if self.childNodes is _NO_NODES:
+            self._child_nodes = []
+        self._child_nodes.append(node)
+        self._changed()
+        self._tree_changed()
+        self._queue_mutation('childList', added=[node], previous_sibling=previous)
+        
+        index = self._live_index()
+        if index is not None:
+            index.add_subtree(node)
         return node
     
-class DOMStringList:
+    def removeChild(self, node):
+        index = node._live_index()
+        if index is not None:
+            index.discard_subtree(node)
+            
+        position = self.childNodes.index(node)
+        previous = self._child_nodes[position - 1] if position else None
+        following = self._child_nodes[position + 1] if position + 1 < len(self._child_nodes) else None
+        del self._child_nodes[position]
+        node.parentNode = None
+        self._changed()
+        self._tree_changed()
+        self._queue_mutation('childList', removed=[node], previous_sibling=previous, next_sibling=following)
+        return node
+    
+    def _observed_document(self):
+        document = self if isinstance(self, Document) else self.ownerDocument
+        if document is None or not document._observer_count:
+            return None
+        return document
+    
+    def _tree_changed(self):
+        # moving nodes changes which subtree observers see them
+        document = self._observed_document()
+        if document is not None:
+            document._observer_version += 1
+    
+    def _observers(self, document):
+        # observers interested in this node, collected from its own and its ancestors' registrations
+        cache = self._observer_cache
+        if cache is not None and cache[0] == document._observer_version:
+            return cache[1]
+        
+        interested = {}
+        node = self
+        while node is not None:
+            for registration in node._registrations:
+                if node is self or registration.subtree:
+                    interested.setdefault(registration.observer, []).append(registration)
+            node = node.parentNode
+        observers = tuple(interested.items())
+        self._observer_cache = (document._observer_version, observers)
+        return observers
+    
+    def _queue_mutation(self, kind, name=None, old_value=None, added=(), removed=(), previous_sibling=None, next_sibling=None):
+        document = self._observed_document()
+        if document is None:
+            return
+        
+        for observer, registrations in self._observers(document):
+            wanted = False
+            old = None
+            for registration in registrations:
+                if not registration.wants(kind, name):
+                    continue
+                wanted = True
+                if kind == 'attributes' and registration.attributeOldValue or kind == 'characterData' and registration.characterDataOldValue:
+                    old = old_value
+            if wanted:
+                observer._enqueue(MutationRecord(kind, self, added, removed, previous_sibling, next_sibling, name, old))
+    
+    def _changed(self):
+        # serialized html is cached per element, a mutation drops it on the path up to the root
+        node = self
+        while node is not None:
+            if isinstance(node, Element):
+                node._inner_html = node._outer_html = None
+            node = node.host if isinstance(node, ShadowRoot) else node.parentNode
+    
+    def _event_parent(self, event):
+        parent = self.parentNode
+        if isinstance(parent, ShadowRoot) and not event.composed:
+            return None
+        return parent
+    
+    def hasChildNodes(self):
+        return bool(self.childNodes)
+    
+class Text(NodeType):
+    __slots__ = ('_data',)
+    
+    def __init__(self, data=''):
+        super().__init__(node_type=NodeType.TEXT_NODE, node_name='#text')
+        self._data = data
+        
+    @property
+    def data(self):
+        return self._data
+    
+    @data.setter
+    def data(self, value):
+        old_value = self._data
+        self._data = str(value)
+        self._changed()
+        self._queue_mutation('characterData', old_value=old_value)
+        
+    @property
+    def textContent(self):
+        return self._data
+    
+    @textContent.setter
+    def textContent(self, value):
+        self.data = value
+    
+    @property
+    def nodeValue(self):
+        return self._data
+    
+    @nodeValue.setter
+    def nodeValue(self, value):
+        self.data = value
+    
+    def toHTML(self):
+        parent = self.parentNode
+        if parent is not None and getattr(parent, 'tagName', '').lower() in RAW_TEXT_ELEMENTS:
+            return self.data
+        return html.escape(self.data, quote=False)
+    
+    def __repr__(self):
+        return f'<Text {self.data[:20]!r}>'
+    
+def _ancestors(node):
+    path = [node]
+    while node.parentNode is not None:
+        node = node.parentNode
+        path.append(node)
+    path.reverse()
+    return path
+
+def _precedes(a, b):
+    # tree order of two distinct nodes, only the children of their closest common ancestor are compared
+    a_path = _ancestors(a)
+    b_path = _ancestors(b)
+    depth = 0
+    while depth < len(a_path) and depth < len(b_path) and a_path[depth] is b_path[depth]:
+        depth += 1
+    if depth == len(a_path):
+        return True
+    if depth == len(b_path):
+        return False
+    
+    # scanning from both ends, inserts mostly happen near the end of a long sibling list
+    siblings = a_path[depth - 1].childNodes
+    a, b = a_path[depth], b_path[depth]
+    front, back = 0, len(siblings) - 1
+    while front <= back:
+        node = siblings[front]
+        if node is a or node is b:
+            return node is a
+        node = siblings[back]
+        if node is a or node is b:
+            return node is b
+        front += 1
+        back -= 1
+    return False
+
+class _Insertion:
+    # the elements of one inserted subtree are contiguous in tree order, so per bucket the first one decides
+    # whether they are appended or spliced in before the first element following the subtree
+    def __init__(self, index, root):
+        self.index = index
+        self.root = root
+        self.late = {}
+        
+    def place(self, key, elements, element):
+        if key not in self.late:
+            self.late[key] = [] if elements and not _precedes(next(reversed(elements)), self.root) else None
+        late = self.late[key]
+        if late is None:
+            elements[element] = None
+        else:
+            late.append(element)
+            
+    def finish(self):
+        for key, late in self.late.items():
+            if late:
+                self.index._splice(key, late, self.root)
+
+class DOMIndex:
+    # id, tag, class and name buckets, dicts keep insertion order and serve as ordered sets kept in tree order
     def __init__(self):
-        self.length = 0
+        self.version = 0
+        self.all = {}
+        self.buckets = {'tag': {}, 'id': {}, 'class': {}, 'name': {}}
+        
+    @staticmethod
+    def _keys(kind, value):
+        if value is None:
+            return ()
+        if kind == 'class':
+            return str(value).split()
+        return (str(value),)
+    
+    def _link(self, kind, keys, element, insertion):
+        bucket = self.buckets[kind]
+        for key in keys:
+            insertion.place((kind, key), bucket.setdefault(key, {}), element)
+            
+    def _unlink(self, kind, keys, element):
+        bucket = self.buckets[kind]
+        for key in keys:
+            elements = bucket.get(key)
+            if elements is not None:
+                elements.pop(element, None)
+                if not elements:
+                    del bucket[key]
+    
+    def _splice(self, key, late, root):
+        kind, key = key
+        elements = self.all if kind == 'all' else self.buckets[kind][key]
+        
+        # usually only a few elements follow the inserted subtree (a trailing script...), those move behind it
+        tail = []
+        for element in reversed(elements):
+            if _precedes(element, root):
+                for element in tail:
+                    del elements[element]
+                elements.update(dict.fromkeys(late))
+                elements.update(dict.fromkeys(reversed(tail)))
+                return
+            tail.append(element)
+            if len(tail) > 16:
+                break
         
+        items = list(elements)
+        low, high = 0, len(items)
+        while low < high:
+            middle = (low + high) // 2
+            if _precedes(items[middle], root):
+                low = middle + 1
+            else:
+                high = middle
+        items[low:low] = late
+        if kind == 'all':
+            self.all = dict.fromkeys(items)
+        else:
+            self.buckets[kind][key] = dict.fromkeys(items)
+    
+    def add(self, element, insertion):
+        insertion.place(('all', None), self.all, element)
+        self._link('tag', (element.tagName,), element, insertion)
+        for kind in INDEXED_ATTRIBUTES:
+            self._link(kind, self._keys(kind, element.attributes.get(kind)), element, insertion)
+        self.version += 1
+        
+    def discard(self, element):
+        self.all.pop(element, None)
+        self._unlink('tag', (element.tagName,), element)
+        for kind in INDEXED_ATTRIBUTES:
+            self._unlink(kind, self._keys(kind, element.attributes.get(kind)), element)
+        self.version += 1
+        
+    def add_subtree(self, node):
+        insertion = _Insertion(self, node)
+        for element in _iter_elements(node):
+            self.add(element, insertion)
+        insertion.finish()
+            
+    def discard_subtree(self, node):
+        for element in _iter_elements(node):
+            self.discard(element)
+        
+    def change(self, element, kind, old, new):
+        if element not in self.all:
+            return
+        self._unlink(kind, self._keys(kind, old), element)
+        insertion = _Insertion(self, element)
+        self._link(kind, self._keys(kind, new), element, insertion)
+        insertion.finish()
+        self.version += 1
+        
+    def lookup(self, kind, key):
+        return self.buckets[kind].get(key, {})
+
+def _iter_elements(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Element):
+            yield node
+        stack.extend(reversed(node.childNodes))
+
+class HTMLCollection(HostObject):
+    # live collection, the element list is only recomputed after the document index changed
+    def __init__(self, document, select):
+        self._document = document
+        self._select = select
+        self._version = None
+        self._items = []
+        
+    def _elements(self):
+        index = document_index(self._document)
+        if self._version != index.version:
+            self._items = list(self._select(index))
+            self._version = index.version
+        return self._items
+    
+    @property
+    def length(self):
+        return len(self._elements())
+    
+    def item(self, index):
+        items = self._elements()
+        return items[index] if 0 <= index < len(items) else None
+    
+    def namedItem(self, name):
+        return next((el for el in self._elements() if el.id == name or el.attributes.get('name') == name), None)
+    
     def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
+        if isinstance(key, (int, float)) and not isinstance(key, bool):
+            return self.item(int(key))
+        value = self._host_get(key)
+        return value if value is not None else self.namedItem(key)
+    
+    def __iter__(self):
+        return iter(self._elements())
     
-class Location:
+    def __len__(self):
+        return len(self._elements())
+    
+    def __repr__(self):
+        return f'<HTMLCollection length={len(self)}>'
+
+def _select(root, selector, first=False):
+    # the subject's id, class or tag narrows candidates through the index, everything else walks the subtree;
+    # index buckets are kept in tree order, so the matches come out in tree order either way
+    compiled = compile_selector(selector)
+    hint = compiled.hint()
+    document = root if isinstance(root, Document) else getattr(root, 'ownerDocument', None)
+    
+    if hint is not None and document is not None and isinstance(root, NodeType) and root.isConnected:
+        candidates = document_index(document).lookup(*hint)
+        if root is not document:
+            candidates = (el for el in candidates if el is not root and root._contains(el))
+    else:
+        candidates = _iter_elements(root)
+        
+    matches = (el for el in candidates if el is not root and compiled.match(el))
+    if first:
+        return next(matches, None)
+    return list(matches)
+
+def document_index(document):
+    if document._dom_index is None:
+        index = DOMIndex()
+        index.add_subtree(document)
+        document._dom_index = index
+    return document._dom_index
+    
+class DOMStringList(HostObject):
+    def __init__(self):
+        self.length = 0
+    
+class Location(HostObject):
     def __init__(self, domain):
         self.ancestorOrigins = DOMStringList()
         self.hash = ''
@@ -53,29 +620,42 @@ class Location:
         self.protocol = domain.split('//')[0]
         self.search = ''
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class Event:
+class Event(HostObject):
+    NONE = 0
+    CAPTURING_PHASE = 1
+    AT_TARGET = 2
+    BUBBLING_PHASE = 3
+    
     def __init__(self, type_, options=None):
         options = options or {}
         self.type = type_
         self.bubbles = options.get('bubbles', False)
         self.cancelable = options.get('cancelable', False)
+        self.composed = options.get('composed', False)
         self.defaultPrevented = False
         self.target = None
         self.currentTarget = None
+        self.eventPhase = Event.NONE
+        self.isTrusted = False
+        self.timeStamp = options.get('timeStamp', 0.0)
         self._stopped = False
+        self._stopped_immediately = False
+        self._passive = False
+        self._path = []
         
     def preventDefault(self):
-        if self.cancelable:
+        if self.cancelable and not self._passive:
             self.defaultPrevented = True
 
     def stopPropagation(self):
         self._stopped = True
         
+    def stopImmediatePropagation(self):
+        self._stopped = self._stopped_immediately = True
+        
+    def composedPath(self):
+        return list(self._path)
+        
     def __repr__(self):
         return f'<Event type="{self.type}">'
     
@@ -102,25 +682,144 @@ class MouseEvent(Event):
         self.shiftKey = options.get('shiftKey', False)
         self.x = options.get('x', self.clientX)
         self.y = options.get('y', self.clientY)
-        
-    def preventDefault(self):
-        if self.cancelable:
-            self.defaultPrevented = True
-
-    def stopPropagation(self):
-        pass
-
-    def stopImmediatePropagation(self):
-        pass
 
     def __repr__(self):
         return f"<MouseEvent type='{self.type}' client=({self.clientX},{self.clientY})>"
+    
+class KeyboardEvent(Event):
+    def __init__(self, type_, options=None):
+        super().__init__(type_, options)
+        options = options or {}
+        self.key = options.get('key', '')
+        self.code = options.get('code', '')
+        self.keyCode = options.get('keyCode', 0)
+        self.which = options.get('which', self.keyCode)
+        self.location = options.get('location', 0)
+        self.repeat = options.get('repeat', False)
+        self.isComposing = options.get('isComposing', False)
+        self.altKey = options.get('altKey', False)
+        self.ctrlKey = options.get('ctrlKey', False)
+        self.metaKey = options.get('metaKey', False)
+        self.shiftKey = options.get('shiftKey', False)
+        
+    def __repr__(self):
+        return f"<KeyboardEvent type='{self.type}' key={self.key!r}>"
+        
+class MutationRecord(HostObject):
+    def __init__(self, type_, target, added=(), removed=(), previous_sibling=None, next_sibling=None, name=None, old_value=None):
+        self.type = type_
+        self.target = target
+        self.addedNodes = list(added)
+        self.removedNodes = list(removed)
+        self.previousSibling = previous_sibling
+        self.nextSibling = next_sibling
+        self.attributeName = name
+        self.attributeNamespace = None
+        self.oldValue = old_value
+        
+    def __repr__(self):
+        return f"<MutationRecord type='{self.type}' target={self.target!r}>"
+
+class _Registration:
+    __slots__ = (
+        'observer', 'childList', 'attributes', 'characterData', 'subtree', 'attributeOldValue',
+        'characterDataOldValue', 'attributeFilter'
+    )
+    
+    def __init__(self, observer, options):
+        self.observer = observer
+        self.childList = bool(options.get('childList'))
+        self.subtree = bool(options.get('subtree'))
+        self.attributeOldValue = bool(options.get('attributeOldValue'))
+        self.characterDataOldValue = bool(options.get('characterDataOldValue'))
+        attribute_filter = options.get('attributeFilter')
+        self.attributeFilter = frozenset(attribute_filter) if attribute_filter is not None else None
+        
+        attributes = options.get('attributes')
+        self.attributes = bool(attributes) or attributes is None and (self.attributeOldValue or self.attributeFilter is not None)
+        character_data = options.get('characterData')
+        self.characterData = bool(character_data) or character_data is None and self.characterDataOldValue
+        
+    def wants(self, kind, name=None):
+        if kind == 'childList':
+            return self.childList
+        if kind == 'characterData':
+            return self.characterData
+        return self.attributes and (self.attributeFilter is None or name in self.attributeFilter)
+
+class MutationObserver(HostObject):
+    # records queue up per observer and are delivered in one microtask per batch of mutations
+    def __init__(self, callback, window=None):
+        self.callback = callback
+        self._window = window
+        self._records = []
+        self._targets = []
+        self._pending = False
+        
+    def observe(self, target, options=None):
+        options = options or {}
+        registration = _Registration(self, options)
+        if not (registration.childList or registration.attributes or registration.characterData):
+            raise TypeError("The options object must set at least one of 'attributes', 'characterData', or 'childList' to true.")
+        if registration.attributeOldValue and not registration.attributes or registration.attributeFilter is not None and not registration.attributes:
+            raise TypeError("The options object may only set 'attributeOldValue' or 'attributeFilter' when 'attributes' is true or not present.")
+        if registration.characterDataOldValue and not registration.characterData:
+            raise TypeError("The options object may only set 'characterDataOldValue' when 'characterData' is true or not present.")
+        
+        document = target if isinstance(target, Document) else target.ownerDocument
+        existing = [other for other in target._registrations if other.observer is not self]
+        if len(existing) == len(target._registrations):
+            self._targets.append(target)
+            if document is not None:
+                document._observer_count += 1
+        target._registrations = tuple(existing) + (registration,)
+        if document is not None:
+            document._observer_version += 1
+        
+    def disconnect(self):
+        for target in self._targets:
+            target._registrations = tuple(other for other in target._registrations if other.observer is not self)
+            document = target if isinstance(target, Document) else target.ownerDocument
+            if document is not None:
+                document._observer_count -= 1
+                document._observer_version += 1
+        self._targets = []
+        self._records = []
         
-class ShadowRoot:
+    def takeRecords(self):
+        records, self._records = self._records, []
+        return records
+    
+    def _enqueue(self, record):
+        records = self._records
+        last = records[-1] if records else None
+        if (
+            last is not None and record.type == 'childList' and last.type == 'childList' and last.target is record.target
+            and not last.removedNodes and not record.removedNodes and last.nextSibling is None and record.nextSibling is None
+            and last.addedNodes and record.previousSibling is last.addedNodes[-1]
+        ):
+            # consecutive appends to the same parent collapse into one record
+            last.addedNodes.extend(record.addedNodes)
+        else:
+            records.append(record)
+            
+        if not self._pending and self._window is not None:
+            self._pending = True
+            self._window._notify_mutation_observer(self)
+            
+    def _deliver(self):
+        self._pending = False
+        records = self.takeRecords()
+        if records:
+            self.callback(records, self)
+
+class ShadowRoot(EventTarget):
     def __init__(self, host, mode='open'):
         self.host = host
         self.mode = mode
         self.childNodes = []
+        self.parentNode = None
+        self._event_listeners = _NO_ATTRIBUTES
         
         self.innerHTML = ''
         self.isConnected = True
@@ -130,17 +829,17 @@ class ShadowRoot:
     def appendChild(self, node):
         node.parentNode = self
         self.childNodes.append(node)
+        self.host._changed()
         return node
     
     def querySelector(self, selector):
-        for child in self.childNodes:
-            if getattr(child, 'matches', lambda _: False)(selector):
-                return child
-            if hasattr(child, 'querySelector'):
-                result = child.querySelector(selector)
-                if result:
-                    return result
-        return None
+        return _select(self, selector, first=True)
+    
+    def querySelectorAll(self, selector):
+        return _select(self, selector)
+    
+    def _event_parent(self, event):
+        return self.host if event.composed else None
         
     def toHTML(self):
         return ''.join(child.toHTML() if hasattr(child, 'toHTML') else str(child) for child in self.childNodes)
@@ -149,23 +848,40 @@ class ShadowRoot:
         return f"<ShadowRoot mode={self.mode} children={len(self.childNodes)}>"
 
 class Element(NodeType):
+    __slots__ = (
+        'tagName', 'attributes', '_style', 'shadowRoot', 'tabIndex', 'onfocus', 'onblur', '_source',
+        '_inner_html', '_outer_html'
+    )
+    
     def __init__(self, tag_name):
-        super().__init__(node_type=1, node_name=tag_name.upper())
-        self.tagName = tag_name.upper()
-        self.children = []
-        self.nodeType = NodeType.ELEMENT_NODE
-        self.attributes = {}
-        self.id = None
-        self.innerHTML = ''
-        self.style = {}
-        self.parentNode = None
+        tag_name = tag_name.upper()
+        super().__init__(node_type=NodeType.ELEMENT_NODE, node_name=tag_name)
+        self.tagName = tag_name
+        self.attributes = _NO_ATTRIBUTES
+        self._style = None
+        self.shadowRoot = None
         
-        self.classNAme = ''
-        self.ownerDocument = None
         self.tabIndex = -1
         self.onfocus = None
         self.onblur = None
-        self._event_listeners = {}
+        self._source = None
+        self._inner_html = None
+        self._outer_html = None
+        
+    def _own_attributes(self):
+        if self.attributes is _NO_ATTRIBUTES:
+            self.attributes = {}
+        return self.attributes
+    
+    @property
+    def style(self):
+        if self._style is None:
+            self._style = {}
+        return self._style
+    
+    @style.setter
+    def style(self, value):
+        self._style = value
         
     @property
     def className(self):
@@ -173,70 +889,144 @@ class Element(NodeType):
     
     @className.setter
     def className(self, value):
-        self.attributes['class'] = value
+        self._attribute_changed('class', value)
+        self._own_attributes()['class'] = value
+        
+    @property
+    def id(self):
+        return self.attributes.get('id')
+    
+    @id.setter
+    def id(self, value):
+        self._attribute_changed('id', value)
+        if value is None:
+            if 'id' in self.attributes:
+                del self.attributes['id']
+        else:
+            self._own_attributes()['id'] = value
+            
+    def _attribute_changed(self, name, value):
+        self._changed()
+        self._queue_mutation('attributes', name=name, old_value=self.attributes.get(name))
+        if name in INDEXED_ATTRIBUTES:
+            index = self._live_index()
+            if index is not None:
+                index.change(self, name, self.attributes.get(name), value)
+        
+    @classmethod
+    def _from_source(cls, tag, document):
+        element = cls(tag.name)
+        element._source = tag
+        element._child_nodes = None
+        element.ownerDocument = document
+        
+        if tag.attrs:
+            element.attributes = {
+                key: ' '.join(value) if isinstance(value, list) else value for key, value in tag.attrs.items()
+            }
+        return element
+    
+    @property
+    def innerHTML(self):
+        if self._inner_html is None:
+            if self._child_nodes is None:
+                self._inner_html = self._source.decode_contents()
+            else:
+                self._inner_html = ''.join([node.toHTML() for node in self._child_nodes])
+        return self._inner_html
+    
+    @innerHTML.setter
+    def innerHTML(self, value):
+        self._replace_children(_fragment_nodes(str(value), self.ownerDocument) if value else ())
+        
+    @property
+    def textContent(self):
+        return ''.join(node.textContent for node in self.childNodes)
+    
+    @textContent.setter
+    def textContent(self, value):
+        value = '' if value is None else str(value)
+        node = None
+        if value:
+            node = Text(value)
+            node.ownerDocument = self.ownerDocument
+        self._replace_children((node,) if node is not None else ())
+        
+    def _replace_children(self, nodes):
+        index = self._live_index()
+        removed = list(self.childNodes if self._observed_document() is not None else self._child_nodes or ())
+        for node in removed:
+            if index is not None:
+                index.discard_subtree(node)
+            node.parentNode = None
+        self._child_nodes = [] if nodes else _NO_NODES
+        self._source = None
+        self._changed()
+        
+        for node in nodes:
+            node.parentNode = self
+            self._child_nodes.append(node)
+            if index is not None:
+                index.add_subtree(node)
+                    
+        self._tree_changed()
+        if removed or self._child_nodes:
+            self._queue_mutation('childList', added=list(self._child_nodes), removed=removed)
+                    
+    @property
+    def outerHTML(self):
+        return self.toHTML()
         
     def attachShadow(self, options):
         mode = options.get('mode', 'open')
         self.shadowRoot = ShadowRoot(host=self, mode=mode)
+        self._changed()
         return self.shadowRoot
     
     def matches(self, selector):
-        if selector.startswith("#"):
-            return self.id == selector[1:]
-        if selector.startswith("."):
-            return selector[1:] in self.className.split()
-        return self.tagName == selector.upper()
+        return compile_selector(selector).match(self)
+    
+    def closest(self, selector):
+        compiled = compile_selector(selector)
+        node = self
+        while isinstance(node, Element):
+            if compiled.match(node):
+                return node
+            node = node.parentNode
+        return None
 
     def toHTML(self):
-        tag = self.tagName.upper()
-        attrs = f' class="{self.className}"' if self.className else ''
-        children_html = ''.join(child.toHTML() if hasattr(child, 'toHTML') else str(child) for child in self.children)
-        shadow_html = self.shadowRoot.toHTML() if self.shadowRoot and self.shadowRoot.mode == 'open' else ''
-        content = shadow_html + self.innerHTML + children_html
-        return f'<{tag}{attrs}>{content}</{tag}>'
-        
-    def addEventListener(self, event_type, callback):
-        if event_type not in self._event_listeners:
-            self._event_listeners[event_type] = []
-        self._event_listeners[event_type].append(callback)
-
-    def removeEventListener(self, event_type, callback):
-        if event_type in self._event_listeners:
-            try:
-                self._event_listeners[event_type].remove(callback)
-            except ValueError:
-                pass
-
-    def dispatchEvent(self, event):
-        event.target = self
-        event.currentTarget = self
-        listeners = self._event_listeners.get(event['type'], [])
-        for callback in listeners:
-            callback(event)
-        return not event.defaultPrevented
+        if self._outer_html is not None:
+            return self._outer_html
+        
+        tag = self.tagName.lower()
+        parts = ['<', tag]
+        for key, value in self.attributes.items():
+            parts.append(f' {key}="{html.escape(str(value))}"')
+        parts.append('>')
+        
+        if tag not in VOID_ELEMENTS:
+            if self.shadowRoot and self.shadowRoot.mode == 'open':
+                parts.append(self.shadowRoot.toHTML())
+            parts.extend((self.innerHTML, '</', tag, '>'))
+        self._outer_html = ''.join(parts)
+        return self._outer_html
         
     def focus(self):
         if self.ownerDocument:
             self.ownerDocument.activeElement = self
-            if callable(self.onfocus):
-                self.onfocus()
-            self.dispatchEvent({'type': 'focus', 'target': self})
+            self.dispatchEvent(Event('focus', {'composed': True}))
     
     def blur(self):
         if self.ownerDocument and self.ownerDocument.activeElement == self:
             self.ownerDocument.activeElement = None
-            if callable(self.onblur):
-                self.onblur()
-            self.dispatchEvent({'type': 'focus', 'target': self})
+            self.dispatchEvent(Event('blur', {'composed': True}))
         
     def setAttribute(self, key, value):
-        self.attributes[key] = value
+        self._attribute_changed(key, value)
+        self._own_attributes()[key] = value
         
-        if key == 'class':
-            self.className = value
-        elif key == 'id':
-            self.id = value
-        elif key == 'tabIndex':
+        if key == 'tabIndex':
             try:
                 self.tabIndex = int(value)
             except ValueError:
@@ -246,61 +1036,131 @@ class Element(NodeType):
         return self.attributes.get(name, None)
     
     def removeAttribute(self, name):
-        self.attributes.pop(name, None)
+        if name in self.attributes:
+            self._attribute_changed(name, None)
+            del self.attributes[name]
         
     def querySelector(self, selector):
-        if selector.startswith('#'):
-            target_id = selector[:1]
-            return self._find_by_id(target_id)
-        else:
-            return self._find_by_tag(selector.upper())
-        
-    def _find_by_id(self, id_value):
-        if self.id == id_value:
-            return self
-        
-        for child in self.children:
-            found = child._find_by_id(id_value)
-            if found:
-                return found
-        return
-    
-    def _find_by_tag(self, tag_name):
-        if self.tagName == tag_name:
-            return self
-        for child in self.children:
-            found = child._find_by_tag(tag_name)
-            if found:
-                return found
-        return
+        return _select(self, selector, first=True)
+    
+    def querySelectorAll(self, selector):
+        return _select(self, selector)
+        
+    def _contains(self, node):
+        while node is not None:
+            if node is self:
+                return True
+            node = node.parentNode
+        return False
     
     def __repr__(self):
         return f"<{self.tagName} class='{self.className}' id='{self.id}'>"
-    
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
         
 
+def _fragment_nodes(markup, document):
+    # innerHTML writes skip the full document parser, nodes are built while tokenizing
+    def element(tag, attributes):
+        node = Element(tag)
+        node.ownerDocument = document
+        node._child_nodes = []
+        if attributes:
+            node.attributes = attributes
+        return node
+    
+    def text(data):
+        node = Text(data)
+        node.ownerDocument = document
+        return node
+    return parse_fragment(markup, element, text)
+
 class Document(NodeType):
-    def __init__(self, window, domain, html='', content_type='text/html'):
+    def __init__(self, window, domain, html='', content_type='text/html', parser=None, view=None):
         self._html_code = html
-        self._soup = BeautifulSoup(self._html_code, 'html.parser')
+        self._parsed = None
+        self.parser = parser or DEFAULT_PARSER
         super().__init__(node_type=9, node_name='#document')
+        self._child_nodes = None
+        self._dom_index = None
+        self._collections = {}
+        self._observer_count = 0
+        self._observer_version = 0
         
         self.readyState = False
         self.domain = domain
         self.window = window
+        self._view = view
         self.location = Location(domain)
         self.baseURI = 'https://' + (domain.split('/')[2] if len(domain.split('/')) > 3 else domain) + '/'
         self.contentType = content_type
-        self.body = {
-            'innerHTML': repr(self._html_code)
-        }
-        self.children = []
         self._activeElement = None
         self.fullscreen = False
+        self.currentScript = None
+    
+    @property
+    def _soup(self):
+        if self._parsed is None:
+            self._parsed = get_parser(self.parser)(self._html_code)
+        return self._parsed
+    
+    @property
+    def _source(self):
+        return self._soup
+    
+    def _wrap(self, node):
+        from bs4.element import Tag, NavigableString, PreformattedString
+        
+        if isinstance(node, Tag):
+            return Element._from_source(node, self)
+        if isinstance(node, NavigableString) and not isinstance(node, PreformattedString):
+            text = Text(str(node))
+            text.ownerDocument = self
+            return text
+        return None
+    
+    def _wrap_children(self):
+        nodes = NodeType._wrap_children(self)
+        elements = [node for node in nodes if isinstance(node, Element)]
+        if not elements or any(element.tagName == 'HTML' for element in elements):
+            return nodes
+        
+        # html.parser keeps a bare fragment as it is, browsers (and lxml) move it into html and body
+        html, head, body = (self.createElement(tag) for tag in ('html', 'head', 'body'))
+        for node in nodes:
+            node.parentNode = body
+        body._child_nodes = list(nodes)
+        head._child_nodes = _NO_NODES
+        html._child_nodes = [head, body]
+        head.parentNode = body.parentNode = html
+        html.parentNode = self
+        return [html]
+    
+    def _event_parent(self, event):
+        return self._view
+    
+    @property
+    def documentElement(self):
+        children = self.children
+        return children[0] if children else None
+    
+    def _root_child(self, tag_name):
+        root = self.documentElement
+        if root is None:
+            return None
+        return next((child for child in root.children if child.tagName == tag_name), None)
+    
+    @property
+    def head(self):
+        return self._root_child('HEAD')
+    
+    @property
+    def body(self):
+        return self._root_child('BODY')
+    
+    @property
+    def title(self):
+        head = self.head
+        title = next((child for child in head.children if child.tagName == 'TITLE'), None) if head else None
+        return title.textContent if title else ''
     
     @property
     def activeElement(self):
@@ -310,86 +1170,65 @@ class Document(NodeType):
     def activeElement(self, element):
         self._activeElement = element
     
+    def _collection(self, kind, key=None):
+        # the same live collection is handed out for the same query, like browsers do
+        cache_key = (kind, key)
+        if cache_key not in self._collections:
+            if kind == 'all':
+                select = lambda index: index.all
+            else:
+                select = lambda index: index.lookup(kind, key)
+            self._collections[cache_key] = HTMLCollection(self, select)
+        return self._collections[cache_key]
+    
     @property
     def all(self):
-        total_elements = []
-        
-        def _dfs(node):
-            if isinstance(node, Element):
-                total_elements.append(node)
-            for child in getattr(node, 'children', []):
-                _dfs(child)
-        _dfs(self)
-        return total_elements
+        return self._collection('all')
+    
+    @property
+    def scripts(self):
+        return self._collection('tag', 'SCRIPT')
         
     def createElement(self, tag_name):
-        elem =  Element(tag_name)
-        self.children.append(elem)
-        self.all.append(elem)
+        elem = Element(tag_name)
+        elem.ownerDocument = self
         return elem
     
+    def createTextNode(self, data):
+        node = Text(str(data))
+        node.ownerDocument = self
+        return node
+    
     def getElementsByName(self, name):
-        return [el for el in self.all if el.attributes.get('name') == name]
+        return self._collection('name', str(name))
     
     def getElementsByTagName(self, tag_name):
-        results = []
-
-        def traverse(node):
-            if hasattr(node, 'tag_name'):
-                if tag_name == '*' or node.tag_name.lower() == tag_name.lower():
-                    results.append(node)
-            if hasattr(node, 'childNodes'):
-                for child in node.childNodes:
-                    traverse(child)
-
-        traverse(self)
-        return results
+        if tag_name == '*':
+            return self.all
+        return self._collection('tag', tag_name.upper())
     
-    def getElementById(self, element_id):
-        found = None
-
-        def traverse(node):
-            nonlocal found
-            if getattr(node, 'id', None) == element_id:
-                found = node
-                return
-            if hasattr(node, 'childNodes'):
-                for child in node.childNodes:
-                    traverse(child)
-                    if found:
-                        return
-        traverse(self)
-        return found
+    def getElementsByClassName(self, class_names):
+        names = str(class_names).split()
+        if len(names) == 1:
+            return self._collection('class', names[0])
+        
+        def select(index):
+            first = index.lookup('class', names[0]) if names else {}
+            return [el for el in first if all(el in index.lookup('class', name) for name in names[1:])]
+        return HTMLCollection(self, select)
     
-    def appendChild(self, node):
-        if not hasattr(self, '_child_nodes'):
-            self._child_nodes = []
-        self._child_nodes.append(node)
-        node.parentNode = self
+    def getElementById(self, element_id):
+        return next(iter(document_index(self).lookup('id', element_id)), None)
     
     def querySelector(self, selector):
-        for child in self.children:
-            found = child.querySelector(selector)
-            
-            if found:
-                return found
-        return
+        return _select(self, selector, first=True)
     
     def querySelectorAll(self, selector):
-        name_match = re.match(r'\[name=["\'](.+?)["\']\]', selector)
-        if name_match:
-            name = name_match.group(1)
-            return self.getElementsByName(name)
-        return []
+        return _select(self, selector)
         
     def __str__(self):
         return repr(self._html_code)
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
 
 if __name__ == '__main__':
     window = {
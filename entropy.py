@@ -0,0 +1,158 @@
+import os
+import time
+import uuid
+import random
+import hashlib
+
+from host import nondeterministic
+
+RANDOM_BLOCK = 4096
+VIRTUAL_EPOCH_MS = 1735689600000.0
+VIRTUAL_TICK_MS = 1.0
+
+
+def seed_to_int(seed):
+    if isinstance(seed, int) and not isinstance(seed, bool) and seed >= 0:
+        return seed
+    return int.from_bytes(hashlib.sha256(repr(seed).encode()).digest()[:16], 'big')
+
+class SystemEntropy:
+    seeded = False
+
+    def random(self, api='Math.random'):
+        nondeterministic(api)
+        return random.random()
+
+    def bytes(self, length, api='crypto'):
+        nondeterministic(api)
+        return os.urandom(length)
+
+    def uuid4(self, api='crypto.randomUUID'):
+        nondeterministic(api)
+        return uuid.uuid4()
+
+class SeededEntropy:
+    # Math.random and crypto draw from separate pcg64 streams, so one never shifts the other
+    seeded = True
+
+    def __init__(self, seed):
+        import numpy
+        floats, data = numpy.random.SeedSequence(seed_to_int(seed)).spawn(2)
+        self.seed = seed
+        self._floats = numpy.random.Generator(numpy.random.PCG64(floats))
+        self._bytes = numpy.random.Generator(numpy.random.PCG64(data))
+        self._block = []
+        self._index = 0
+
+    def random(self, api='Math.random'):
+        if self._index >= len(self._block):
+            self._block = self._floats.random(RANDOM_BLOCK).tolist()
+            self._index = 0
+
+        value = self._block[self._index]
+        self._index += 1
+        return value
+
+    def bytes(self, length, api='crypto'):
+        return self._bytes.bytes(length)
+
+    def uuid4(self, api='crypto.randomUUID'):
+        return uuid.UUID(bytes=self.bytes(16), version=4)
+
+class SystemClock:
+    seeded = False
+
+    def __init__(self):
+        self._started = time.monotonic()
+
+    def time_ms(self, api='Date.now'):
+        nondeterministic(api)
+        return time.time() * 1000
+
+    def monotonic_ms(self, api='performance.now'):
+        nondeterministic(api)
+        return (time.monotonic() - self._started) * 1000
+
+class VirtualClock:
+    # every read moves time forward by one tick, so elapsed-time checks still see progress
+    seeded = True
+
+    def __init__(self, epoch_ms=VIRTUAL_EPOCH_MS, tick_ms=VIRTUAL_TICK_MS):
+        self.epoch_ms = epoch_ms
+        self.tick_ms = tick_ms
+        self.elapsed_ms = 0.0
+
+    def time_ms(self, api='Date.now'):
+        self.elapsed_ms += self.tick_ms
+        return self.epoch_ms + self.elapsed_ms
+
+    def monotonic_ms(self, api='performance.now'):
+        self.elapsed_ms += self.tick_ms
+        return self.elapsed_ms
+
+    def advance_to(self, elapsed_ms):
+        self.elapsed_ms = max(self.elapsed_ms, elapsed_ms)
+
+def make_entropy(seed=None):
+    return SystemEntropy() if seed is None else SeededEntropy(seed)
+
+def make_clock(seed=None):
+    return SystemClock() if seed is None else VirtualClock()
+
+class RecordingEntropy:
+    def __init__(self, inner, trace):
+        self.inner = inner
+        self.trace = trace
+        self.seeded = inner.seeded
+
+    def random(self, api='Math.random'):
+        return self.trace.record('random', self.inner.random(api))
+
+    def bytes(self, length, api='crypto'):
+        return self.trace.record('bytes', self.inner.bytes(length, api))
+
+    def uuid4(self, api='crypto.randomUUID'):
+        return uuid.UUID(bytes=self.bytes(16, api), version=4)
+
+class ReplayEntropy:
+    seeded = True
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def random(self, api='Math.random'):
+        return self.trace.replay('random')
+
+    def bytes(self, length, api='crypto'):
+        data = self.trace.replay('bytes')
+        if len(data) != length:
+            from replay import ReplayDivergence
+            raise ReplayDivergence(f'{api} asked for {length} bytes, the trace has {len(data)}')
+        return data
+
+    def uuid4(self, api='crypto.randomUUID'):
+        return uuid.UUID(bytes=self.bytes(16, api), version=4)
+
+class RecordingClock:
+    def __init__(self, inner, trace):
+        self.inner = inner
+        self.trace = trace
+        self.seeded = inner.seeded
+
+    def time_ms(self, api='Date.now'):
+        return self.trace.record('time', self.inner.time_ms(api))
+
+    def monotonic_ms(self, api='performance.now'):
+        return self.trace.record('monotonic', self.inner.monotonic_ms(api))
+
+class ReplayClock:
+    seeded = True
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def time_ms(self, api='Date.now'):
+        return self.trace.replay('time')
+
+    def monotonic_ms(self, api='performance.now'):
+        return self.trace.replay('monotonic')
@@ -1,16 +1,29 @@
 
 #from sandbox.dom import Sandbox
 import sys
-from window import Window
+import copy
+import types
+from window import Window, Realm
+from host import LazyDict, LazyValue, FrozenDict, OverlayDict, _DELETED
+from profiles import BrowserProfile
+
+_ATOMIC = (type(None), bool, int, float, complex, str, bytes, range, type, types.ModuleType, types.BuiltinFunctionType, BrowserProfile, FrozenDict, Realm)
 
 class ExecutionContext:
-    def __init__(self, selfValue, env):
+    def __init__(self, selfValue, env, window=None):
         self.selfValue = selfValue
         self.env = env
+        self.window = window
+
+    def snapshot(self):
+        return GlobalSnapshot(self)
+
+    def clone(self):
+        return self.snapshot().clone()
 
 class Environment:
-    def __init__(self, record={}, parent=None):
-        self.record = record
+    def __init__(self, record=None, parent=None):
+        self.record = {} if record is None else record
         self.parent = parent
         
     def define(self, name, value=None):
@@ -33,8 +46,137 @@ class Environment:
         self.resolve(name).record[name] = value
         return value
     
+_slot_cache = {}
+
+def _slot_descriptors(cls):
+    descriptors = _slot_cache.get(cls)
+    if descriptors is None:
+        descriptors = _slot_cache[cls] = [
+            vars(klass)[name]
+            for klass in cls.__mro__
+            for name in vars(klass).get('__slots__', ())
+            if name not in ('__dict__', '__weakref__')
+        ]
+    return descriptors
+
+def _copy_value(value, memo):
+    if isinstance(value, _ATOMIC):
+        return value
+
+    key = id(value)
+    if key in memo:
+        return memo[key]
+
+    if isinstance(value, LazyDict):
+        # unbuilt entries stay lazy, their factories are rebound to the copied window
+        result = memo[key] = LazyDict()
+        for k, v in dict.items(value):
+            dict.__setitem__(result, k, _copy_value(v, memo))
+        return result
+
+    if isinstance(value, OverlayDict) and isinstance(value._base, FrozenDict):
+        # realm overlays keep sharing the frozen intrinsics, only local writes are copied
+        result = memo[key] = OverlayDict(value._base, value._copier)
+        for k, v in dict.items(value):
+            dict.__setitem__(result, k, v if v is _DELETED else _copy_value(v, memo))
+        return result
+
+    if isinstance(value, dict):
+        result = memo[key] = {}
+        for k, v in value.items():
+            result[_copy_value(k, memo)] = _copy_value(v, memo)
+        return result
+
+    if isinstance(value, list):
+        result = memo[key] = [] if type(value) is list else type(value).__new__(type(value))
+        result.extend(_copy_value(v, memo) for v in value)
+        if hasattr(value, '__dict__'):
+            result.__dict__.update({k: _copy_value(v, memo) for k, v in value.__dict__.items()})
+        return result
+
+    if isinstance(value, tuple) and type(value) is tuple:
+        return tuple(_copy_value(v, memo) for v in value)
+
+    if isinstance(value, types.FunctionType):
+        return _copy_function(value, memo)
+
+    if isinstance(value, types.MethodType):
+        result = memo[key] = types.MethodType(value.__func__, _copy_value(value.__self__, memo))
+        return result
+
+    cls = type(value)
+    slots = _slot_descriptors(cls)
+    if not (slots or hasattr(value, '__dict__')) or hasattr(cls, '__deepcopy__') or cls.__reduce_ex__ is not object.__reduce_ex__:
+        try:
+            return copy.deepcopy(value, memo)
+        except Exception:
+            # threads, locks and native handles stay shared
+            return value
+
+    result = memo[key] = cls.__new__(cls)
+    for descriptor in slots:
+        try:
+            descriptor.__set__(result, _copy_value(descriptor.__get__(value, cls), memo))
+        except AttributeError:
+            pass
+    if hasattr(value, '__dict__'):
+        result.__dict__.update({k: _copy_value(v, memo) for k, v in value.__dict__.items()})
+    return result
+
+def _copy_function(func, memo):
+    # closures keep their ast/interpreter cells, only captured scopes and functions are rebound
+    if not func.__closure__:
+        return func
+
+    cells = []
+    rebound = False
+    for cell in func.__closure__:
+        try:
+            content = cell.cell_contents
+        except ValueError:
+            cells.append(cell)
+            continue
+
+        if id(content) in memo or isinstance(content, (Environment, ExecutionContext)):
+            cells.append(types.CellType(_copy_value(content, memo)))
+            rebound = True
+        else:
+            cells.append(cell)
+
+    if not rebound:
+        return func
+
+    result = types.FunctionType(func.__code__, func.__globals__, func.__name__, func.__defaults__, tuple(cells))
+    result.__kwdefaults__ = func.__kwdefaults__
+    result.__dict__.update(func.__dict__)
+    memo[id(func)] = result
+    return result
+
+class GlobalSnapshot:
+    def __init__(self, ctx):
+        memo = {}
+        self.globals = _copy_value(ctx.selfValue, memo)
+        self.env = _copy_value(ctx.env, memo)
+        self.window = _copy_value(ctx.window, memo) if ctx.window is not None else None
+
+    def clone(self):
+        memo = {}
+        global_obj = OverlayDict(self.globals, lambda value: _copy_value(value, memo))
+        env = Environment(global_obj, None)
+        ctx = ExecutionContext(global_obj, env)
+
+        memo[id(self.globals)] = global_obj
+        memo[id(self.env)] = env
+
+        if self.window is not None:
+            window = type(self.window).__new__(type(self.window))
+            memo[id(self.window)] = window
+            window.__dict__.update({k: _copy_value(v, memo) for k, v in self.window.__dict__.items()})
+            ctx.window = window
+        return ctx
+
 def init_globalEnv(**kwargs):
     sandbox = Window(**kwargs)
     globalenv = Environment(sandbox.env)
-    globalexec = ExecutionContext(sandbox.env, globalenv)
+    globalexec = ExecutionContext(sandbox.env, globalenv, sandbox)
     return globalexec
\ No newline at end of file
@@ -0,0 +1,130 @@
+import re
+from html import unescape
+
+VOID_ELEMENTS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'
+))
+_RAW_TEXT = frozenset(('script', 'style', 'textarea', 'title', 'xmp', 'noscript'))
+_ESCAPABLE_RAW_TEXT = frozenset(('textarea', 'title'))
+
+_BLOCK = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'details', 'div', 'dl', 'fieldset', 'figcaption', 'figure', 'footer',
+    'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'main', 'menu', 'nav', 'ol', 'p', 'pre', 'section',
+    'table', 'ul'
+))
+# start tags that close an open element of the listed kinds, the optional end tags browsers infer
+_IMPLIED_END = {
+    'li': ('li',),
+    'dt': ('dt', 'dd'),
+    'dd': ('dt', 'dd'),
+    'tr': ('tr', 'td', 'th'),
+    'td': ('td', 'th'),
+    'th': ('td', 'th'),
+    'option': ('option',),
+    'thead': ('tbody', 'tfoot', 'tr', 'td', 'th'),
+    'tbody': ('thead', 'tfoot', 'tr', 'td', 'th'),
+    'tfoot': ('thead', 'tbody', 'tr', 'td', 'th'),
+}
+_SCOPE = frozenset(('ul', 'ol', 'dl', 'table', 'tbody', 'thead', 'tfoot', 'tr', 'select', 'div'))
+
+_MARKUP = re.compile(r'''
+    <(?:
+        !--(?P<comment>.*?)(?:-->|\Z)
+      | [!?][^>]*>
+      | /(?P<end>[a-zA-Z][^\s/>]*)[^>]*>
+      | (?P<start>[a-zA-Z][^\s/>]*)(?P<attrs>(?:[^>"'/]|/(?!>)|"[^"]*"|'[^']*')*)(?P<selfclose>/?)>
+    )
+''', re.S | re.X)
+_RAW_TEXT_END = {tag: re.compile(r'</%s\s*>' % tag, re.I) for tag in _RAW_TEXT}
+_ATTRIBUTE = re.compile(r'''([^\s/>"'=][^\s/>=]*)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?''')
+
+
+def _attributes(source):
+    attributes = {}
+    for name, double, single, bare in _ATTRIBUTE.findall(source):
+        name = name.lower()
+        if name not in attributes:
+            value = double or single or bare
+            attributes[name] = unescape(value) if '&' in value else value
+    return attributes
+
+def parse_fragment(markup, element, text):
+    # single pass tokenizer building nodes straight away: element(tag, attributes) and text(data) are node factories
+    # returning objects with a list in `_child_nodes`; the top level nodes are returned in order
+    root = []
+    stack = []
+    children = root
+    position = 0
+    length = len(markup)
+
+    def add(node):
+        node.parentNode = stack[-1][1] if stack else None
+        children.append(node)
+
+    while position < length:
+        start = markup.find('<', position)
+        if start < 0:
+            start = length
+        if start > position:
+            data = markup[position:start]
+            add(text(unescape(data) if '&' in data else data))
+        if start >= length:
+            break
+
+        match = _MARKUP.match(markup, start)
+        if match is None:
+            # a stray '<' is text
+            next_start = markup.find('<', start + 1)
+            end = length if next_start < 0 else next_start
+            add(text(markup[start:end]))
+            position = end
+            continue
+        position = match.end()
+
+        tag = match['start']
+        if tag is not None:
+            tag = tag.lower()
+            closes = _IMPLIED_END.get(tag, ('p',) if tag in _BLOCK else ())
+            if closes:
+                cut = None
+                for depth in range(len(stack) - 1, -1, -1):
+                    open_tag = stack[depth][0]
+                    if open_tag in closes:
+                        cut = depth
+                    elif open_tag in _SCOPE:
+                        break
+                if cut is not None:
+                    del stack[cut:]
+                    children = stack[-1][1]._child_nodes if stack else root
+
+            node = element(tag, _attributes(match['attrs']) if match['attrs'].strip() else {})
+            add(node)
+            if tag in VOID_ELEMENTS or match['selfclose'] and tag not in _RAW_TEXT:
+                continue
+
+            if tag in _RAW_TEXT:
+                close = _RAW_TEXT_END[tag].search(markup, position)
+                end = close.start() if close else length
+                data = markup[position:end]
+                if data:
+                    if tag in _ESCAPABLE_RAW_TEXT and '&' in data:
+                        data = unescape(data)
+                    child = text(data)
+                    child.parentNode = node
+                    node._child_nodes.append(child)
+                position = close.end() if close else length
+                continue
+
+            stack.append((tag, node))
+            children = node._child_nodes
+            continue
+
+        tag = match['end']
+        if tag is not None:
+            tag = tag.lower()
+            for depth in range(len(stack) - 1, -1, -1):
+                if stack[depth][0] == tag:
+                    del stack[depth:]
+                    children = stack[-1][1]._child_nodes if stack else root
+                    break
+    return root
@@ -0,0 +1,223 @@
+import threading
+import contextlib
+from reprlib import recursive_repr
+
+_MISSING = object()
+_DELETED = object()
+_recording = threading.local()
+_running = threading.local()
+
+def nondeterministic(api):
+    # host apis reading entropy or the wall clock report here, results depending on them can't be cached
+    names = getattr(_recording, 'names', None)
+    if names is not None:
+        names.add(api)
+
+def script_running():
+    # the js stack is not empty, microtasks wait for the outermost script to finish
+    return getattr(_running, 'interpreter', None) is not None
+
+class ExecutionLimitExceeded(Exception):
+    def __init__(self, limit, stats):
+        super().__init__(f'Execution limit exceeded: {limit}', stats)
+        self.limit = limit
+        self.stats = stats
+
+@contextlib.contextmanager
+def record_nondeterminism():
+    previous = getattr(_recording, 'names', None)
+    _recording.names = names = set()
+    try:
+        yield names
+    finally:
+        _recording.names = previous
+
+class HostObject:
+    # members exposed to js are collected once per class instead of dir(self) on every read
+    __slots__ = ()
+    _host_members = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._host_members = frozenset(
+            name
+            for klass in cls.__mro__ if klass not in (HostObject, object)
+            for name in vars(klass) if not name.startswith('__')
+        )
+
+    def _host_get(self, key, default=None):
+        if not isinstance(key, str):
+            try:
+                return self.__dict__.get(key, default)
+            except (TypeError, AttributeError):
+                return default
+
+        # getattr instead of __dict__ so slotted objects don't materialize an empty dict on every read
+        if key in self._host_members:
+            return getattr(self, key, default)
+        if key.startswith('__') or key in _HOST_RESERVED:
+            return default
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        return self._host_get(key)
+
+    def __setitem__(self, key, value):
+        if not isinstance(key, str):
+            self.__dict__[key] = value
+            return
+
+        # properties without a setter are read only, like getter-only accessors in the browser
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            pass
+
+    def keys(self):
+        own = [key for key in self.__dict__ if isinstance(key, str) and not key.startswith('_')]
+        return own + sorted(key for key in self._host_members if not key.startswith('_') and key not in self.__dict__)
+
+_HOST_RESERVED = frozenset(dir(HostObject))
+
+
+class LazyValue:
+    def __init__(self, factory):
+        self.factory = factory
+
+class LazyDict(dict):
+    # entries holding a LazyValue are built on first lookup and cached in place
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if type(value) is LazyValue:
+            value = value.factory()
+            dict.__setitem__(self, key, value)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        return dict.pop(self, key, *default)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def copy(self):
+        return dict(self.items())
+
+    @recursive_repr('{...}')
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+class FrozenDict(dict):
+    # read-only mapping for intrinsics shared by every window in the process
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('Cannot modify a frozen object')
+
+    __setitem__ = __delitem__ = _readonly
+    pop = popitem = setdefault = update = clear = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+class OverlayDict(dict):
+    # only written keys live in the dict itself, the rest are copied from base on first read
+    def __init__(self, base, copier):
+        super().__init__()
+        self._base = base
+        self._copier = copier
+
+    def __getitem__(self, key):
+        if dict.__contains__(self, key):
+            value = dict.__getitem__(self, key)
+            if value is _DELETED:
+                raise KeyError(key)
+            return value
+
+        value = self._copier(dict.__getitem__(self._base, key))
+        if type(value) is LazyValue:
+            value = value.factory()
+        dict.__setitem__(self, key, value)
+        return value
+
+    def __contains__(self, key):
+        if dict.__contains__(self, key):
+            return dict.__getitem__(self, key) is not _DELETED
+        return key in self._base
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        dict.__setitem__(self, key, _DELETED)
+
+    def __iter__(self):
+        for key in self._base:
+            if not dict.__contains__(self, key):
+                yield key
+        for key, value in dict.items(self):
+            if value is not _DELETED:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    @recursive_repr('{...}')
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        dict.__setitem__(self, key, _DELETED)
+        return value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def copy(self):
+        return dict(self.items())
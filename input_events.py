@@ -0,0 +1,225 @@
+from document import MouseEvent, KeyboardEvent
+from entropy import seed_to_int
+
+MOUSE_TYPES = ('mousemove', 'mousedown', 'mouseup', 'click')
+KEY_TYPES = ('keydown', 'keyup')
+MOVE, DOWN, UP, CLICK = range(4)
+KEYDOWN, KEYUP = range(2)
+DISPATCH_BATCH = 256
+
+_SHIFTED = '~!@#$%^&*()_+{}|:"<>?'
+_KEY_CODES = {' ': ('Space', 32), '\n': ('Enter', 13), '\t': ('Tab', 9)}
+
+
+def _key_info(char):
+    if char in _KEY_CODES:
+        code, key_code = _KEY_CODES[char]
+        return ('Enter' if char == '\n' else char), code, key_code
+    if char.isalpha():
+        return char, f'Key{char.upper()}', ord(char.upper())
+    if char.isdigit():
+        return char, f'Digit{char}', ord(char)
+    return char, '', ord(char)
+
+class EventTrace:
+    # one column per field, rows only become event objects when they are dispatched or indexed
+    def __init__(self, kind, time_ms, codes, x=None, y=None, buttons=None, keys=''):
+        self.kind = kind
+        self.time_ms = time_ms
+        self.codes = codes
+        self.x = x
+        self.y = y
+        self.buttons = buttons
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.time_ms)
+
+    def __add__(self, other):
+        import numpy
+
+        if other.kind != self.kind:
+            raise TypeError(f'Cannot join a {self.kind} trace with a {other.kind} trace')
+        if self.kind == 'mouse':
+            return EventTrace(
+                'mouse',
+                numpy.concatenate((self.time_ms, other.time_ms)),
+                numpy.concatenate((self.codes, other.codes)),
+                numpy.concatenate((self.x, other.x)),
+                numpy.concatenate((self.y, other.y)),
+                numpy.concatenate((self.buttons, other.buttons)),
+            )
+        return EventTrace(
+            'keyboard',
+            numpy.concatenate((self.time_ms, other.time_ms)),
+            numpy.concatenate((self.codes, other.codes)),
+            keys=self.keys + other.keys,
+        )
+
+    @property
+    def duration_ms(self):
+        return float(self.time_ms[-1] - self.time_ms[0]) if len(self) else 0.0
+
+    def event(self, i):
+        return next(self._events(i, i + 1))
+
+    def __iter__(self):
+        for start in range(0, len(self), DISPATCH_BATCH):
+            yield from self._events(start, start + DISPATCH_BATCH)
+
+    def _events(self, start, stop):
+        # columns are converted a batch at a time, tolist() is far cheaper than indexing arrays per row
+        times = self.time_ms[start:stop].tolist()
+        codes = self.codes[start:stop].tolist()
+
+        if self.kind == 'mouse':
+            xs = self.x[start:stop].tolist()
+            ys = self.y[start:stop].tolist()
+            buttons = self.buttons[start:stop].tolist()
+            previous = (self.x[start - 1], self.y[start - 1]) if start > 0 else (xs[0], ys[0]) if xs else (0, 0)
+            px, py = float(previous[0]), float(previous[1])
+
+            for t, code, x, y, pressed in zip(times, codes, xs, ys, buttons):
+                event = MouseEvent(MOUSE_TYPES[code], {
+                    'bubbles': True, 'cancelable': code != MOVE, 'composed': True,
+                    'clientX': x, 'clientY': y, 'pageX': x, 'pageY': y, 'screenX': x, 'screenY': y,
+                    'movementX': x - px if code == MOVE else 0, 'movementY': y - py if code == MOVE else 0,
+                    'button': 0, 'buttons': pressed,
+                })
+                event.timeStamp = t
+                px, py = x, y
+                yield event
+            return
+
+        for t, code, char in zip(times, codes, self.keys[start:stop]):
+            key, key_code_name, key_code = _key_info(char)
+            event = KeyboardEvent(KEY_TYPES[code], {
+                'bubbles': True, 'cancelable': True, 'composed': True,
+                'key': key, 'code': key_code_name, 'keyCode': key_code,
+                'shiftKey': char.isupper() or char in _SHIFTED,
+            })
+            event.timeStamp = t
+            yield event
+
+def _rng(seed):
+    import numpy
+    return numpy.random.default_rng(None if seed is None else seed_to_int(seed))
+
+def _intervals(rng, count, mean_ms, spread):
+    # human inter-event gaps are right skewed, a log-normal around the mean fits them well enough
+    import numpy
+    mu = numpy.log(mean_ms) - spread * spread / 2
+    return rng.lognormal(mu, spread, count)
+
+def mouse_path(rng, start, end, duration_ms=None, rate_hz=60.0, jitter_px=0.6, start_ms=0.0):
+    import numpy
+
+    start = numpy.asarray(start, dtype=float)
+    end = numpy.asarray(end, dtype=float)
+    distance = float(numpy.hypot(*(end - start)))
+    if duration_ms is None:
+        # Fitts-like: longer moves take longer, with a floor for tiny corrections
+        duration_ms = 120.0 + 110.0 * numpy.log2(1.0 + distance / 12.0) * rng.uniform(0.85, 1.2)
+
+    gaps = _intervals(rng, max(2, int(duration_ms * rate_hz / 1000.0)), 1000.0 / rate_hz, 0.25)
+    time_ms = start_ms + numpy.cumsum(gaps)
+    progress = numpy.clip((time_ms - start_ms) / (time_ms[-1] - start_ms), 0.0, 1.0)
+    eased = progress * progress * (3.0 - 2.0 * progress)
+
+    # cubic bezier with control points pushed off the straight line
+    direction = end - start
+    normal = numpy.array([-direction[1], direction[0]]) / (distance or 1.0)
+    bend = rng.normal(0.0, 0.18, 2) * distance
+    c1 = start + direction * rng.uniform(0.2, 0.4) + normal * bend[0]
+    c2 = start + direction * rng.uniform(0.6, 0.8) + normal * bend[1]
+    s = eased[:, None]
+    points = (
+        (1 - s) ** 3 * start + 3 * (1 - s) ** 2 * s * c1 + 3 * (1 - s) * s ** 2 * c2 + s ** 3 * end
+    )
+    points[:-1] += rng.normal(0.0, jitter_px, (len(points) - 1, 2))
+    points = numpy.rint(points)
+
+    count = len(time_ms)
+    return EventTrace(
+        'mouse', time_ms, numpy.full(count, MOVE, dtype=numpy.uint8),
+        points[:, 0], points[:, 1], numpy.zeros(count, dtype=numpy.uint8),
+    )
+
+def mouse_click(rng, x, y, start_ms=0.0, button_held_ms=85.0):
+    import numpy
+
+    down = start_ms + float(_intervals(rng, 1, 40.0, 0.4)[0])
+    up = down + float(_intervals(rng, 1, button_held_ms, 0.3)[0])
+    return EventTrace(
+        'mouse',
+        numpy.array([down, up, up]),
+        numpy.array([DOWN, UP, CLICK], dtype=numpy.uint8),
+        numpy.full(3, float(x)), numpy.full(3, float(y)),
+        numpy.array([1, 0, 0], dtype=numpy.uint8),
+    )
+
+def keystrokes(rng, text, start_ms=0.0, wpm=220.0):
+    import numpy
+
+    count = len(text)
+    if not count:
+        return EventTrace('keyboard', numpy.zeros(0), numpy.zeros(0, dtype=numpy.uint8))
+
+    # 5 characters per word, flight time between key presses and dwell time while a key is held
+    flight = _intervals(rng, count, 60000.0 / (wpm * 5.0), 0.35)
+    dwell = _intervals(rng, count, 90.0, 0.3)
+    down = start_ms + numpy.cumsum(flight)
+    up = down + dwell
+
+    time_ms = numpy.concatenate((down, up))
+    codes = numpy.concatenate((numpy.full(count, KEYDOWN, numpy.uint8), numpy.full(count, KEYUP, numpy.uint8)))
+    chars = numpy.concatenate((numpy.arange(count), numpy.arange(count)))
+    order = numpy.argsort(time_ms, kind='stable')
+    return EventTrace('keyboard', time_ms[order], codes[order], keys=''.join(text[i] for i in chars[order].tolist()))
+
+class InputSimulator:
+    # keeps the cursor position and a simulated timeline, nothing ever sleeps
+    def __init__(self, window, seed=None, position=(0.0, 0.0)):
+        self.window = window
+        if seed is None:
+            seed = window.seed
+        self.rng = _rng(seed)
+        self.position = position
+        self.now_ms = float(getattr(window.clock, 'elapsed_ms', 0.0))
+
+    def _advance(self, trace):
+        if len(trace):
+            self.now_ms = float(trace.time_ms[-1])
+        return trace
+
+    def move_to(self, x, y, duration_ms=None, rate_hz=60.0):
+        trace = mouse_path(self.rng, self.position, (x, y), duration_ms, rate_hz, start_ms=self.now_ms)
+        self.position = (x, y)
+        return self._advance(trace)
+
+    def click(self, x=None, y=None):
+        if x is None:
+            x, y = self.position
+        trace = self.move_to(x, y) if (x, y) != tuple(self.position) else None
+        click = self._advance(mouse_click(self.rng, x, y, self.now_ms))
+        return trace + click if trace is not None else click
+
+    def type(self, text, wpm=220.0):
+        return self._advance(keystrokes(self.rng, text, self.now_ms, wpm))
+
+    def dispatch(self, trace, target=None):
+        # events go to the target (the window when omitted) in batches, the virtual clock follows the trace
+        if target is None:
+            target = self.window
+            dispatch = self.window._dispatchEvent
+        else:
+            dispatch = target.dispatchEvent
+        advance = getattr(self.window.clock, 'advance_to', None)
+
+        dispatched = 0
+        for event in trace:
+            if advance is not None:
+                advance(event.timeStamp)
+            dispatch(event)
+            dispatched += 1
+        return dispatched
@@ -1,10 +1,11 @@
 import sys
+import time
 import types
-import esprima
+import contextlib
+from host import _running, ExecutionLimitExceeded
 from js_properties import Prototype
 from environment import init_globalEnv, ExecutionContext, Environment
-
-userfunc_tostring = {}
+from window import JSArray
 
 
 def unsigned_right_shift(x, n):
@@ -46,10 +47,14 @@ def js_in_operator(left, right):
             index = int(left)
         except ValueError:
             return False
-        return 0 <= index < len(right)
+        return 0 <= index < len(right) and not (isinstance(right, JSArray) and right.is_hole(index))
     else:
         raise TypeError(f"Cannot use 'in' operator with {type(right)}")
     
+def running_interpreter(default=None):
+    # js functions run on the interpreter evaluating on this thread, not the one that defined them
+    return getattr(_running, 'interpreter', None) or default
+
 def ast_to_dict(node):
     if isinstance(node, list):
         return [ast_to_dict(n) for n in node]
@@ -110,49 +115,154 @@ class JSFunction:
         else:
             self.props[key] = value
 
+def to_js(value):
+    if isinstance(value, JSHandle):
+        return value.func
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [to_js(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): to_js(item) for key, item in value.items()}
+    return value
+
+class JSHandle:
+    # python callable bound to a js function, calls skip parsing and go straight to the function
+    def __init__(self, interpreter, name, func):
+        self.interpreter = interpreter
+        self.name = name
+        self.func = func
+        
+    def __call__(self, *args, this=None):
+        return self.interpreter.call_function(self.func, args, this)
+    
+    def many(self, args_list, this=None):
+        return self.interpreter.call_many(self.func, args_list, this)
+    
+    def __repr__(self):
+        return f'<JSHandle {self.name}>'
+
+class ExecutionLimits:
+    # how many nodes are evaluated between two clock reads
+    CHECK_INTERVAL = 1024
+    
+    def __init__(self, max_nodes=None, max_time=None, max_depth=None):
+        self.max_nodes = max_nodes
+        self.max_time = max_time
+        self.max_depth = max_depth
+
 class JSInterpreter:
-    def __init__(self, code, exec_ctx):
+    def __init__(self, code, exec_ctx, limits=None):
         self.scriptCode = code
         self.call_stack = [exec_ctx]
         self.flags = {
             'continue': False,
             'break': False
         }
+        self.limits = limits
+        self.node_count = 0
+        self.max_depth_reached = 0
+        self._started = None
+        self._deadline = None
+        self._next_check = None
+        
+    def start_run(self):
+        self.node_count = 0
+        self.max_depth_reached = len(self.call_stack)
+        self._started = time.monotonic()
+        self._deadline = None
+        self._next_check = None
+        
+        if self.limits is not None:
+            if self.limits.max_time is not None:
+                self._deadline = self._started + self.limits.max_time
+            self._next_check = self._next_limit_check()
+            
+    @property
+    def stats(self):
+        return {
+            'nodes': self.node_count,
+            'elapsed': time.monotonic() - self._started if self._started else 0.0,
+            'depth': len(self.call_stack),
+            'max_depth': self.max_depth_reached
+        }
+        
+    def _next_limit_check(self):
+        next_check = self.node_count + ExecutionLimits.CHECK_INTERVAL
+        if self.limits.max_nodes is not None:
+            next_check = min(next_check, self.limits.max_nodes + 1)
+        return next_check
+    
+    def check_limits(self):
+        limits = self.limits
+        
+        if limits.max_nodes is not None and self.node_count > limits.max_nodes:
+            raise ExecutionLimitExceeded('max_nodes', self.stats)
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            raise ExecutionLimitExceeded('max_time', self.stats)
+        self._next_check = self._next_limit_check()
+        
+    def check_depth(self):
+        depth = len(self.call_stack)
+        if depth > self.max_depth_reached:
+            self.max_depth_reached = depth
+            
+        if self.limits is not None and self.limits.max_depth is not None and depth > self.limits.max_depth:
+            raise ExecutionLimitExceeded('max_depth', self.stats)
         
     def evaluate(self, node, ctx=None):
         if ctx is None:
             ctx = self.call_stack[len(self.call_stack) - 1]
             
         if node['type'] == 'Program':
-            self.hoistVariables(node, ctx)
-            result = None
-            for nodo in node['body']:
-                evaluated = self.evaluate(nodo)
-                
-                if evaluated is not None:
-                    result = evaluated
+            self.start_run()
+        
+        self.node_count += 1
+        if self._next_check is not None and self.node_count >= self._next_check:
+            self.check_limits()
+            
+        if node['type'] == 'Program':
+            previous = getattr(_running, 'interpreter', None)
+            window = self.call_stack[0].window
+            
+            with self._task(previous):
+                _running.interpreter = self
+                base = len(self.call_stack)
+                
+                try:
+                    self.hoistVariables(node, ctx)
+                    result = None
+                    for nodo in node['body']:
+                        evaluated = self.evaluate(nodo)
+                        
+                        if evaluated is not None:
+                            result = evaluated
+                finally:
+                    del self.call_stack[base:]
+                    _running.interpreter = previous
+                    
+                if previous is None and window is not None:
+                    window.perform_microtask_checkpoint()
             return result
         
         if node['type'] == 'FunctionDeclaration':
             self_ref = self
             parent_env = ctx.env
             is_new_target = False
+            params = [param['name'] for param in node['params']]
+            frame = dict.fromkeys(params)
 
             def func(*args, new_target=None, this=None):
                 nonlocal is_new_target
+                interpreter = running_interpreter(self_ref)
                 
-                activation_record = {}
-                for i in range(len(node['params'])):
-                    param_name = node['params'][i]['name']
-                    activation_record[param_name] = args[i] if i < len(args) else None
-
+                activation_record = frame.copy()
+                activation_record.update(zip(params, args))
                 activation_record['arguments'] = list(args)
 
                 if new_target:
                     is_new_target = True
                     this = this or {}
                     for stmt in node['body']['body']:
-                        result = self_ref.constructor_props(stmt, ctx)
+                        result = interpreter.constructor_props(stmt, ctx)
                         if result:
                             this.update(result)
                             
@@ -160,13 +270,19 @@ class JSInterpreter:
                     this = {}
                     
                     
-                this['constructor'] = func
+                if not isinstance(this, (list, str)):
+                    this['constructor'] = func
 
                 env_inner = Environment(activation_record, parent_env)
                 exec_ctx = ExecutionContext(this, env_inner)
-                self_ref.call_stack.append(exec_ctx)
-
-                result = self_ref.eval_function_block(node['body'], exec_ctx)
+                depth = len(interpreter.call_stack)
+                interpreter.call_stack.append(exec_ctx)
+                try:
+                    interpreter.check_depth()
+                    result = interpreter.eval_function_block(node['body'], exec_ctx)
+                finally:
+                    # a throw or an exceeded limit leaves the frames it unwound on the stack
+                    del interpreter.call_stack[depth:]
 
                 if new_target:
                     return this
@@ -206,6 +322,8 @@ class JSInterpreter:
             
             try:
                 result = self.evaluate(node['block'], ctx)
+            except ExecutionLimitExceeded:
+                raise
             except Exception as e:
                 param_name = node['handler']['param']['name']
                 ctx.env.define(param_name, e)
@@ -224,32 +342,37 @@ class JSInterpreter:
             this = self
             parent_env = ctx.env
             is_new_target = False
+            params = [param['name'] for param in node['params']]
+            frame = dict.fromkeys(params)
 
-            def func(*args, new_target=None, this={}):
+            def func(*args, new_target=None, this=None):
                 nonlocal is_new_target
-                activation_record = {}
+                interpreter = running_interpreter(self)
+                activation_record = frame.copy()
                 
                 if new_target:
                     is_new_target = True
 
-                if name:
+                if name and name not in frame:
                     activation_record[name] = func
 
-                for i in range(len(node['params'])):
-                    param = node['params'][i]['name']
-                    activation_record[param] = args[i] if i < len(args) else None
-
+                activation_record.update(zip(params, args))
                 activation_record['arguments'] = list(args)
                 
-                this = this or {}
-                this['constructor'] = func
+                if not isinstance(this, (list, str)):
+                    # arrays and strings are this for their prototype methods and take no own properties
+                    this = this or {}
+                    this['constructor'] = func
 
                 env_inner = Environment(activation_record, parent_env)
-                exec_ctx = ExecutionContext(this or {}, env_inner)
-                self.call_stack.append(exec_ctx)
-                
-                result = self.eval_function_block(node['body'], exec_ctx)
-                return result
+                exec_ctx = ExecutionContext(this, env_inner)
+                depth = len(interpreter.call_stack)
+                interpreter.call_stack.append(exec_ctx)
+                try:
+                    interpreter.check_depth()
+                    return interpreter.eval_function_block(node['body'], exec_ctx)
+                finally:
+                    del interpreter.call_stack[depth:]
             
             func = JSFunction(func, is_new_target)
             func['call'] = lambda this, *args: func(*args, this=this)
@@ -635,8 +758,8 @@ class JSInterpreter:
             #raise TypeError('Property not found in chain', prop, 'OBJ: ',obj)
         
         if node['type'] == 'WhileStatement':
-            test = node['body']
-            body = node['test']
+            test = node['test']
+            body = node['body']
             result = None
             
             while (self.call_stack[len(self.call_stack) - 1] == ctx and self.evaluate(test, ctx)):
@@ -808,8 +931,56 @@ class JSInterpreter:
         self.call_stack.pop()
         return result
     
+    def _task(self, previous):
+        # the outermost run is a task of the window, timer callbacks wait for it and it for them
+        window = self.call_stack[0].window
+        if previous is None and window is not None:
+            return window.task('script')
+        return contextlib.nullcontext()
+    
+    def fork(self):
+        # same globals and limits, but frames and counters of its own for a callback on another thread
+        return JSInterpreter(None, exec_ctx=self.call_stack[0], limits=self.limits)
+    
+    def get_global(self, name):
+        func = self.call_stack[0].env.lookup(name)
+        if not callable(func):
+            raise TypeError(f'"{name}" is not a function')
+        return JSHandle(self, name, func)
+    
+    def _invoke(self, fn, args, this):
+        depth = len(self.call_stack)
+        self.start_run()
+        try:
+            if isinstance(fn, JSFunction):
+                return fn(*args, this=this)
+            return fn(*args)
+        finally:
+            # a throw leaves the frames of the functions it unwound on the stack
+            del self.call_stack[depth:]
+    
+    def call_function(self, fn, args=(), this=None):
+        return self.call_many(fn, [args], this)[0]
+    
+    def call_many(self, fn, args_list, this=None):
+        if isinstance(fn, JSHandle):
+            fn = fn.func
+            
+        previous = getattr(_running, 'interpreter', None)
+        with self._task(previous):
+            _running.interpreter = self
+            try:
+                results = [self._invoke(fn, [to_js(arg) for arg in args], this) for args in args_list]
+                window = self.call_stack[0].window
+                if previous is None and window is not None:
+                    window.perform_microtask_checkpoint()
+                return results
+            finally:
+                _running.interpreter = previous
+        
     @staticmethod
     def parse_code(code):
+        import esprima
         sys.setrecursionlimit(5000)
         return ast_to_dict(esprima.parseScript(code))
 
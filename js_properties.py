@@ -1,6 +1,7 @@
 import re
 import sys
 import types
+from window import JSFunction as NativeFunction, _intrinsics
 
 class ObjectInterpreter:
     def __init__(self, obj):
@@ -101,6 +102,25 @@ class ObjectProto:
         if key in dir(self):
             return getattr(self, key)
             
+class Members:
+    # member view of an array or string, methods come from the running realm's prototype
+    # and native ones are bound to the value as they are looked up
+    def __init__(self, value, prototype):
+        self.value = value
+        self.prototype = prototype
+        
+    def __getitem__(self, key):
+        value = self.value
+        if key == 'length':
+            return len(value)
+        if isinstance(key, (int, float)) and not isinstance(key, bool):
+            index = int(key)
+            return value[index] if index == key and 0 <= index < len(value) else None
+        member = self.prototype.get(key)
+        if isinstance(member, NativeFunction):
+            return lambda *args, this=None: member.call(value, *args)
+        return member
+    
 class Prototype:
     def object_properties(obj, prop):
         inter_obj = ObjectInterpreter(obj)
@@ -112,12 +132,10 @@ class Prototype:
             return obj, prop
         
         if isinstance(obj, list):
-            array_proto = Prototype.array_prototype(obj)
-            return array_proto, prop
+            return Members(obj, _intrinsics()['Array.prototype']), prop
         
         elif isinstance(obj, str):
-            string_proto = Prototype.string_prototype(obj)
-            return string_proto, prop
+            return Members(obj, _intrinsics()['String.prototype']), prop
         
         elif isinstance(obj, dict):
             object_proto = Prototype.object_prototype(obj)
@@ -144,91 +162,6 @@ class Prototype:
             'toString': lambda this=None: str(number)
         }
         
-    def array_prototype(array, return_protos=False):
-        def _prototypes(array):
-            array_obj = {
-                'length': len(array),
-                '__proto__': {}
-            }
-
-            def update_length():
-                array_obj['length'] = len(array)
-
-            array_obj['push'] = lambda *args, this=None: (
-                array.extend(args),
-                update_length(),
-                len(array)
-            )[-1]
-
-            array_obj['pop'] = lambda this=None: (
-                array.pop(),
-                update_length()
-            )[0]
-
-            array_obj['shift'] = lambda this=None: (
-                array.pop(0),
-                update_length()
-            )[0]
-
-            array_obj['unshift'] = lambda *args, this=None: (
-                [array.insert(i, arg) for i, arg in enumerate(reversed(args))],
-                update_length(),
-                len(array)
-            )[-1]
-
-            array_obj['slice'] = lambda start=0, end=None, this=None: array[start:end]
-            array_obj['splice'] = lambda start, delete_count=None, *items, this=None: (
-                lambda deleted: (
-                    array.__setitem__(slice(start, start + delete_count), items),
-                    update_length(),
-                    deleted
-                )[-1]
-            )([array[i] for i in range(start, start + (delete_count or len(array))) if i < len(array)])
-
-            array_obj['indexOf'] = lambda val, this=None: array.index(val) if val in array else -1
-            array_obj['includes'] = lambda val, this=None: val in array
-            array_obj['join'] = lambda sep=',', this=None: sep.join(str(x) for x in array)
-            array_obj['reverse'] = lambda this=None: (array.reverse(), array_obj)[1]
-            array_obj['map'] = lambda fn, this=None: [fn(x) for x in array]
-            array_obj['forEach'] = lambda fn, this=None: [fn(x) for x in array]
-            array_obj['filter'] = lambda fn, this=None: [x for x in array if fn(x)]
-            array_obj['some'] = lambda fn, this=None: any(fn(x) for x in array)
-            array_obj['every'] = lambda fn, this=None: all(fn(x) for x in array)
-            array_obj['find'] = lambda fn, this=None: next((x for x in array if fn(x)), None)
-            array_obj['findIndex'] = lambda fn, this=None: next((i for i, x in enumerate(array) if fn(x)), -1)
-            array_obj['reduce'] = lambda fn, initial=None, this=None: (
-                lambda acc, items: (
-                    lambda result: result
-                )(acc if not items else __import__('functools').reduce(fn, items, acc))
-            )(initial, array if initial is not None else array[1:])
-
-            array_obj['fill'] = lambda value, start=0, end=None, this=None: (
-                [array.__setitem__(i, value) for i in range(start, end or len(array))],
-                array
-            )[-1]
-
-            array_obj['concat'] = lambda *args, this=None: Prototype.array_prototype([
-                *array, *(item if isinstance(item, list) else [item] for arg in args for item in (arg if isinstance(arg, list) else [arg]))
-            ])
-
-            array_obj['toString'] = lambda this=None: ','.join(str(x) for x in array)
-
-            for idx, val in enumerate(array):
-                array_obj[idx] = val
-
-            array_obj['__proto__'] = {'constructor': 'Array'}
-            
-            for name, func in array_obj.items():
-                if callable(func):
-                    array_obj[name] = JSFunction(func)
-                else:
-                    array_obj[name] = func
-            return array_obj
-
-        if return_protos:
-            return _prototypes
-        return _prototypes(array)
-    
     def object_prototype(obj):
         objects = {
             'constructor': lambda this=None: dict,
@@ -245,50 +178,4 @@ class Prototype:
         
         objects = {k: ObjectProto(v) for k, v in objects.items()}
         objects['trustedTypes'] = None
-        return objects
-    
-    def string_prototype(string, return_protos=False):
-        def to_py_str(val):
-            return str(val) if val is not None else ""
-
-        def _prototypes(string):
-            return {
-                'length': len(string),
-                'charAt': lambda index: string[index] if 0 <= index < len(string) else '',
-                'charCodeAt': lambda index: ord(string[index]) if 0 <= index < len(string) else None,
-                'codePointAt': lambda index: ord(string[index]) if 0 <= index < len(string) else None,
-                'includes': lambda substr, start=0: substr in string[start:],
-                'indexOf': lambda substr, start=0: string.find(substr, start),
-                'lastIndexOf': lambda substr: string.rfind(substr),
-                'startsWith': lambda substr, start=0: string.startswith(substr, start),
-                'endsWith': lambda substr, length=None: string[:length].endswith(substr) if length else string.endswith(substr),
-                'slice': lambda start, end=None: string[start:end],
-                'substring': lambda start, end=None: string[min(start, end or len(string)):max(start, end or len(string))],
-                'substr': lambda start, length=None: string[start:start + length] if length is not None else string[start:],
-                'toLowerCase': lambda: string.lower(),
-                'toUpperCase': lambda: string.upper(),
-                'toLocaleLowerCase': lambda: string.lower(),
-                'toLocaleUpperCase': lambda: string.upper(),
-                'trim': lambda: string.strip(),
-                'trimStart': lambda: string.lstrip(),
-                'trimEnd': lambda: string.rstrip(),
-                'trimLeft': lambda: string.lstrip(),
-                'trimRight': lambda: string.rstrip(),
-                'repeat': lambda count: string * count,
-                'padStart': lambda targetLength, padString=' ': string.rjust(targetLength, padString),
-                'padEnd': lambda targetLength, padString=' ': string.ljust(targetLength, padString),
-                'split': lambda sep=None, limit=None: (string.split(sep) if sep is not None else list(string))[:limit] if limit else (string.split(sep) if sep is not None else list(string)),
-                'replace': lambda pattern, replacement: re.sub(pattern, replacement, string, count=1),
-                'replaceAll': lambda pattern, replacement: re.sub(pattern, replacement, string),
-                'match': lambda pattern: re.findall(pattern, string),
-                'matchAll': lambda pattern: list(re.finditer(pattern, string)),
-                'search': lambda pattern: (m := re.search(pattern, string)).start() if m else -1,
-                'concat': lambda *args: string + ''.join(map(to_py_str, args)),
-                'toString': lambda: string,
-                'valueOf': lambda: string,
-                'join': lambda sep: string.join(sep)
-            }
-            
-        if return_protos:
-            return _prototypes
-        return _prototypes(string)
\ No newline at end of file
+        return objects
\ No newline at end of file
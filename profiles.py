@@ -0,0 +1,124 @@
+import json
+import random
+import functools
+from typing import NamedTuple
+
+PROFILE_CACHE_SIZE = 512
+
+LANGUAGE = 'es-ES'
+SCREEM_RESOLUTIONS = (
+    (3440,1440,3440,1400),
+    (1924,1007,1924,1007),
+    (1920,1080,1920,1040),
+    (1280,720,1280,672),
+    (1920,1080,1920,1032),
+    (1366,651,1366,651),
+    (1366,768,1366,738),
+    (1920,1080,1920,1050)
+)
+
+@functools.lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def _user_agent_data(ua):
+    # parsing is the expensive part of a profile and only depends on the user agent, seeded or not
+    from uaparser import UAParser
+    info = UAParser(ua)
+    
+    return info.browser['name'], info.browser['major'], info.os['name'], info.os['version']
+
+class BrowserProfile(NamedTuple):
+    user_agent: str
+    seed: object
+    browser: str
+    browser_version: str
+    os_name: str
+    os_version: str
+    platform: str
+    navigator_platform: str
+    language: str
+    languages: tuple
+    device_memory: int
+    hardware_concurrency: int
+    device_pixel_ratio: float
+    screen: tuple
+    js_heap_size_limit: int
+    total_js_heap_size: int
+    used_js_heap_size: int
+    
+    @classmethod
+    def create(cls, user_agent, seed=None, platform='Windows', language=LANGUAGE):
+        rng = random.Random(seed) if seed is not None else random
+        browser, browser_version, os_name, os_version = _user_agent_data(user_agent)
+        
+        device_pixel_ratio = rng.uniform(0.9, 1.9)
+        screen = rng.choice(SCREEM_RESOLUTIONS)
+        device_memory = rng.randint(1, 3) << 3
+        hardware_concurrency = rng.randint(2, 6)
+        
+        if platform == 'Android':
+            js_heap_size_limit = 512 * 1024 * 1024
+        else:
+            js_heap_size_limit = 4 * 1024 * 1024 * 1024
+        total_js_heap_size = int(js_heap_size_limit * (rng.random() * 0.045 + 0.005))
+        used_js_heap_size = int(total_js_heap_size * (rng.random() * 0.15 + 0.8))
+        
+        return cls(
+            user_agent=user_agent,
+            seed=seed,
+            browser=browser,
+            browser_version=browser_version,
+            os_name=os_name,
+            os_version=os_version,
+            platform=platform,
+            navigator_platform='Win32',
+            language=language,
+            languages=(language,),
+            device_memory=device_memory,
+            hardware_concurrency=hardware_concurrency,
+            device_pixel_ratio=device_pixel_ratio,
+            screen=screen,
+            js_heap_size_limit=js_heap_size_limit,
+            total_js_heap_size=total_js_heap_size,
+            used_js_heap_size=used_js_heap_size
+        )
+    
+    @classmethod
+    def get(cls, user_agent, seed=None):
+        # unseeded profiles are random on purpose, they reuse the parsed user agent and only draw the random parts
+        if seed is None:
+            return cls.create(user_agent)
+        return _cached_profile(user_agent, seed)
+    
+    @property
+    def mobile(self):
+        return 'Android' in self.os_name
+    
+    def to_dict(self):
+        data = self._asdict()
+        data['languages'] = list(self.languages)
+        data['screen'] = list(self.screen)
+        return data
+    
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        data['languages'] = tuple(data['languages'])
+        data['screen'] = tuple(data['screen'])
+        return cls(**data)
+    
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        
+        if isinstance(data, dict):
+            data = [data]
+        return [cls.from_dict(item) for item in data]
+    
+    @staticmethod
+    def dump(profiles, path):
+        with open(path, 'w') as f:
+            json.dump([profile.to_dict() for profile in profiles], f, indent=4)
+
+@functools.lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def _cached_profile(user_agent, seed):
+    return BrowserProfile.create(user_agent, seed)
@@ -0,0 +1,183 @@
+import sys
+import json
+import time
+import zlib
+import struct
+import threading
+from array import array
+
+from profiles import BrowserProfile
+
+TRACE_MAGIC = b'JSTRACE1'
+FLOAT_STREAMS = ('random', 'time', 'monotonic')
+HOST_EVENT_TIMEOUT = 10.0
+
+
+class ReplayDivergence(Exception):
+    pass
+
+class Trace:
+    # every nondeterministic host value of one window, kept per stream in the order it was produced:
+    # random draws, crypto bytes, clock reads, and the order timers fired and worker messages arrived
+    def __init__(self, profile=None, domain=None, seed=None):
+        self.profile = profile
+        self.domain = domain
+        self.seed = seed
+        self.replaying = False
+        self.streams = {name: [] for name in (*FLOAT_STREAMS, 'bytes', 'host')}
+        self._positions = dict.fromkeys(self.streams, 0)
+        self._turn = threading.Condition()
+        self.event_timeout = HOST_EVENT_TIMEOUT
+
+    def start_recording(self, profile, domain=None, seed=None):
+        self.profile = profile
+        self.domain = domain
+        self.seed = seed
+        self.replaying = False
+        return self
+
+    def start_replay(self):
+        self.replaying = True
+        self._positions = dict.fromkeys(self.streams, 0)
+        return self
+
+    def record(self, stream, value):
+        with self._turn:
+            self.streams[stream].append(value)
+        return value
+
+    def replay(self, stream):
+        with self._turn:
+            position = self._positions[stream]
+            if position >= len(self.streams[stream]):
+                raise ReplayDivergence(f'trace has no more {stream} values ({position} recorded)')
+            self._positions[stream] = position + 1
+            return self.streams[stream][position]
+
+    def host_event(self, kind, key, value=None):
+        self.wait_turn(kind, key)
+        return self.take_turn(kind, key, value)
+    
+    def wait_turn(self, kind, key):
+        # replaying blocks until it is this event's turn, an event the trace never reaches means the replay diverged
+        if not self.replaying:
+            return
+        with self._turn:
+            events = self.streams['host']
+            if [kind, key] not in (event[:2] for event in events[self._positions['host']:]):
+                raise ReplayDivergence(f'{kind} {key!r} is not left in the trace, {self._expected_event()}')
+            deadline = time.monotonic() + self.event_timeout
+            while True:
+                position = self._positions['host']
+                if position < len(events) and events[position][:2] == [kind, key]:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ReplayDivergence(
+                        f'{kind} {key!r} waited {self.event_timeout}s for its turn, {self._expected_event()}'
+                    )
+                self._turn.wait(remaining)
+                
+    def take_turn(self, kind, key, value=None):
+        # recording appends the event, replaying moves past it once its turn came in wait_turn
+        with self._turn:
+            events = self.streams['host']
+            if not self.replaying:
+                events.append([kind, key, value])
+                return value
+            
+            position = self._positions['host']
+            if position >= len(events) or events[position][:2] != [kind, key]:
+                raise ReplayDivergence(f'{kind} {key!r} ran out of turn, {self._expected_event()}')
+            self._positions['host'] = position + 1
+            self._turn.notify_all()
+            return events[position][2]
+                
+    def _expected_event(self):
+        events = self.streams['host']
+        position = self._positions['host']
+        if position >= len(events):
+            return f'the trace has no more host events ({position} recorded)'
+        kind, key = events[position][:2]
+        return f'the trace expects {kind} {key!r} next (host event {position})'
+
+    def dumps(self):
+        header = {
+            'profile': self.profile.to_dict() if self.profile is not None else None,
+            'domain': self.domain,
+            'seed': self.seed
+        }
+        sections = {
+            'header': json.dumps(header, default=repr).encode(),
+            'bytes': b''.join(self.streams['bytes']),
+            'bytes.length': _pack_array('I', map(len, self.streams['bytes'])),
+            'host': json.dumps(self.streams['host'], default=repr).encode()
+        }
+        for name in FLOAT_STREAMS:
+            sections[name] = _pack_array('d', self.streams[name])
+
+        body = b''.join(
+            struct.pack('<H', len(name)) + name.encode() + struct.pack('<I', len(data)) + data
+            for name, data in sections.items()
+        )
+        return TRACE_MAGIC + zlib.compress(body, 6)
+
+    @classmethod
+    def loads(cls, data):
+        if not data.startswith(TRACE_MAGIC):
+            raise ValueError('not a trace file')
+
+        body = zlib.decompress(data[len(TRACE_MAGIC):])
+        sections = {}
+        offset = 0
+        while offset < len(body):
+            (name_length,) = struct.unpack_from('<H', body, offset)
+            name = body[offset + 2:offset + 2 + name_length].decode()
+            offset += 2 + name_length
+            (length,) = struct.unpack_from('<I', body, offset)
+            sections[name] = body[offset + 4:offset + 4 + length]
+            offset += 4 + length
+
+        header = json.loads(sections['header'])
+        profile = BrowserProfile.from_dict(header['profile']) if header['profile'] is not None else None
+        trace = cls(profile, header['domain'], header['seed'])
+
+        for name in FLOAT_STREAMS:
+            trace.streams[name] = _unpack_array('d', sections[name])
+
+        blob = sections['bytes']
+        offset = 0
+        for length in _unpack_array('I', sections['bytes.length']):
+            trace.streams['bytes'].append(blob[offset:offset + length])
+            offset += length
+
+        trace.streams['host'] = json.loads(sections['host'])
+        return trace
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.dumps())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.loads(f.read())
+
+    def __len__(self):
+        return sum(len(stream) for stream in self.streams.values())
+
+    def __repr__(self):
+        return f'<Trace {", ".join(f"{name}={len(stream)}" for name, stream in self.streams.items())}>'
+
+def _pack_array(typecode, values):
+    values = array(typecode, values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+def _unpack_array(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tolist()
@@ -0,0 +1,235 @@
+import io
+import os
+import sys
+import json
+import pickle
+import hashlib
+import contextlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from host import record_nondeterminism
+from interpreter import JSInterpreter
+from environment import init_globalEnv
+from cache import ResultCache, env_fingerprint
+
+AST_CACHE_SIZE = 256
+TEMPLATE_CACHE_SIZE = 16
+
+_ast_cache = OrderedDict()
+_ast_hashes = OrderedDict()
+_templates = OrderedDict()
+_limits = None
+_cache = None
+_seed = None
+
+
+def _cached_lru(cache, key, size, factory):
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+
+    value = factory()
+    cache[key] = value
+    if len(cache) > size:
+        cache.popitem(last=False)
+    return value
+
+def code_key(code):
+    return hashlib.sha1(code.encode('utf-8', 'surrogatepass')).hexdigest()
+
+def is_parsed(code):
+    return code_key(code) in _ast_cache
+
+def parse_cached(code, parse=None):
+    return _cached_lru(_ast_cache, code_key(code), AST_CACHE_SIZE, lambda: (parse or JSInterpreter.parse_code)(code))
+
+def ast_hash(code):
+    # formatting and comments don't change the key, only the parsed program does
+    key = code_key(code)
+    return _cached_lru(
+        _ast_hashes, key, AST_CACHE_SIZE,
+        lambda: hashlib.sha1(json.dumps(parse_cached(code), default=repr).encode()).hexdigest()
+    )
+
+def _cache_key(script, window, limits, *extra):
+    try:
+        script_hash = ast_hash(script)
+    except Exception:
+        return None
+
+    seed = window.seed
+    if seed is None and window.profile is not None:
+        seed = window.profile.seed
+    bounds = (limits.max_nodes, limits.max_time, limits.max_depth) if limits is not None else None
+    return ResultCache.key(script_hash, env_fingerprint(window, bounds, *extra), seed)
+
+def _new_env(domain, user_agent, html, seed=None):
+    return init_globalEnv(domain=domain, user_agent=user_agent, html=html, seed=seed)
+
+def _template(domain, user_agent, html, seed=None):
+    return _cached_lru(
+        _templates, (domain, user_agent, html, seed), TEMPLATE_CACHE_SIZE,
+        lambda: _new_env(domain, user_agent, html, seed).snapshot()
+    )
+
+def _to_plain(value, seen=()):
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    if id(value) in seen:
+        return '[Circular]'
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(v, (*seen, id(value))) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _to_plain(v, (*seen, id(value))) for k, v in value.items()}
+    return repr(value)
+
+def _init_worker(warm_jobs, limits, cache, seed=None):
+    global _limits, _cache, _seed
+    _limits = limits
+    _cache = cache
+    _seed = seed
+    sys.setrecursionlimit(5000)
+
+    for job in warm_jobs:
+        script, domain, user_agent, html = _unpack_job(job)
+        _template(domain, user_agent, html, seed)
+        parse_cached(script)
+
+def _unpack_job(job):
+    if len(job) == 3:
+        return (*job, '')
+    return tuple(job)
+
+def _execute(script, make_ctx, limits, cache=None, key=None):
+    if key is not None:
+        output = cache.get(key)
+        if output is not None:
+            return output
+
+    ctx = make_ctx()
+
+    console = io.StringIO()
+    result = None
+    error = None
+
+    with record_nondeterminism() as touched, contextlib.redirect_stdout(console):
+        try:
+            interpreter = JSInterpreter(script, exec_ctx=ctx, limits=limits)
+            result = _to_plain(interpreter.evaluate(parse_cached(script)))
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+
+    output = {
+        'result': result,
+        'console': console.getvalue(),
+        'error': error,
+        'nondeterministic': sorted(touched)
+    }
+    if key is not None:
+        cache.put(key, output)
+    return output
+
+def run_job(job):
+    script, domain, user_agent, html = _unpack_job(job)
+    template = _template(domain, user_agent, html, _seed)
+    key = None
+    if _cache is not None and template.window is not None:
+        # keyed on the template, a hit doesn't clone it
+        key = _cache_key(script, template.window, _limits)
+    return _execute(script, template.clone, _limits, _cache, key)
+
+def run_many(jobs, workers=None, limits=None, chunksize=1, cache=None, seed=None):
+    jobs = list(jobs)
+    warm_jobs = list({_unpack_job(job)[1:]: job for job in jobs}.values())[:TEMPLATE_CACHE_SIZE]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(warm_jobs, limits, cache, seed)) as pool:
+        return list(pool.map(run_job, jobs, chunksize=chunksize))
+
+class ForkServer:
+    def __init__(self, domain, user_agent, html='', preload=None, limits=None, cache=None, seed=None):
+        if not hasattr(os, 'fork'):
+            raise OSError('ForkServer requires os.fork()')
+
+        self.limits = limits
+        self.cache = cache
+        self.preload = preload
+        self.ctx = _new_env(domain, user_agent, html, seed)
+        sys.setrecursionlimit(5000)
+
+        if preload:
+            interpreter = JSInterpreter(preload, exec_ctx=self.ctx)
+            interpreter.evaluate(parse_cached(preload))
+
+    def _spawn(self, script):
+        # parsed in the server so repeated scripts hit the ast cache in every child
+        try:
+            parse_cached(script)
+        except Exception:
+            pass
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+
+        if pid == 0:
+            # child: the prepared window is shared copy-on-write with the server
+            os.close(read_fd)
+            status = 0
+            try:
+                output = _execute(script, lambda: self.ctx, self.limits)
+                with os.fdopen(write_fd, 'wb') as pipe:
+                    pickle.dump(output, pipe, protocol=pickle.HIGHEST_PROTOCOL)
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+
+        os.close(write_fd)
+        return pid, read_fd
+
+    def _collect(self, pid, read_fd):
+        with os.fdopen(read_fd, 'rb') as pipe:
+            data = pipe.read()
+        _, status = os.waitpid(pid, 0)
+
+        if not data:
+            return {
+                'result': None,
+                'console': '',
+                'error': f'ForkError: child exited with status {os.waitstatus_to_exitcode(status)}',
+                'nondeterministic': []
+            }
+        return pickle.loads(data)
+
+    def run(self, script):
+        return self.run_many([script], parallel=1)[0]
+
+    def run_many(self, scripts, parallel=None):
+        parallel = parallel or os.cpu_count() or 1
+        scripts = list(scripts)
+        results = [None] * len(scripts)
+        pending = []
+
+        # cache hits are answered by the server without forking
+        for index, script in enumerate(scripts):
+            key = _cache_key(script, self.ctx.window, self.limits, self.preload) if self.cache is not None else None
+            output = self.cache.get(key) if key is not None else None
+            if output is not None:
+                results[index] = output
+            else:
+                pending.append((index, script, key))
+
+        for i in range(0, len(pending), parallel):
+            children = [(index, key, self._spawn(script)) for index, script, key in pending[i:i + parallel]]
+            for index, key, (pid, read_fd) in children:
+                results[index] = self._collect(pid, read_fd)
+                if key is not None:
+                    self.cache.put(key, results[index])
+        return results
+
+if __name__ == '__main__':
+    ua = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/132.0.0.0 Safari/537.36'
+    jobs = [(f'console.log({i} * 2); {i} + 1', 'https://www.example.com/', ua, '') for i in range(4)]
+
+    for output in run_many(jobs, workers=2):
+        print(output)
@@ -0,0 +1,161 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from interpreter import JSInterpreter, ExecutionLimits, ExecutionLimitExceeded
+from runner import parse_cached, is_parsed
+from document import Event
+
+CLASSIC_TYPES = frozenset((
+    '', 'text/javascript', 'application/javascript', 'application/ecmascript', 'text/ecmascript', 'application/x-javascript'
+))
+
+
+class PageScript:
+    def __init__(self, element, code, kind, src=None):
+        self.element = element
+        self.code = code
+        self.kind = kind
+        self.src = src
+
+    def __repr__(self):
+        return f'<PageScript {self.kind} src={self.src!r}>'
+
+def _script_kind(element):
+    script_type = (element.attributes.get('type') or '').strip().lower()
+    src = element.attributes.get('src')
+    if script_type == 'module':
+        return 'async' if 'async' in element.attributes else 'defer'
+    if script_type not in CLASSIC_TYPES:
+        return None
+
+    # like browsers, async and defer only change anything for scripts with a src
+    if src is not None:
+        if 'async' in element.attributes:
+            return 'async'
+        if 'defer' in element.attributes:
+            return 'defer'
+    return 'blocking'
+
+def discover_scripts(document, load=None):
+    # load(src) returns the body of an external script, or None when it isn't available
+    scripts = []
+    for element in document.scripts:
+        kind = _script_kind(element)
+        if kind is None:
+            continue
+
+        src = element.attributes.get('src')
+        if src is None:
+            code = element.textContent
+        else:
+            code = load(src) if load is not None else None
+        scripts.append(PageScript(element, code, kind, src))
+    return scripts
+
+def _parse(code):
+    return JSInterpreter.parse_code(code)
+
+class ScriptPipeline:
+    # parser-blocking scripts run in document order, then deferred ones, DOMContentLoaded, async ones and load
+    def __init__(self, ctx, load=None, parse_workers=None, limits=None):
+        self.ctx = ctx
+        self.load = load
+        self.parse_workers = parse_workers
+        self.limits = limits
+        self.document = ctx.env.lookup('document')
+        self.exhausted = None
+        self._nodes_used = 0
+        self._deadline = None
+
+    def ordered(self):
+        scripts = discover_scripts(self.document, self.load)
+        return [[script for script in scripts if script.kind == kind] for kind in ('blocking', 'defer', 'async')]
+
+    def _prefetch(self, pool, scripts):
+        # bodies not parsed yet in this process are parsed in other processes while earlier scripts execute
+        futures = {}
+        for script in scripts:
+            code = script.code
+            if code is not None and code not in futures and not is_parsed(code):
+                futures[code] = pool.submit(_parse, code)
+        return futures
+
+    def _remaining_limits(self):
+        # the page shares one node budget and one deadline, every script gets what the earlier ones left
+        limits = self.limits
+        if limits is None:
+            return None
+
+        max_nodes = None if limits.max_nodes is None else limits.max_nodes - self._nodes_used
+        max_time = None if self._deadline is None else self._deadline - time.monotonic()
+        stats = {'nodes': self._nodes_used, 'elapsed': limits.max_time, 'depth': 0, 'max_depth': 0}
+        if max_nodes is not None and max_nodes < 0:
+            raise ExecutionLimitExceeded('max_nodes', stats)
+        if max_time is not None and max_time <= 0:
+            raise ExecutionLimitExceeded('max_time', stats)
+        return ExecutionLimits(max_nodes, max_time, limits.max_depth)
+
+    def _execute(self, script, futures, outputs):
+        output = {'src': script.src, 'kind': script.kind, 'result': None, 'error': None}
+        outputs.append(output)
+        if script.code is None:
+            output['error'] = f'NetworkError: {script.src} was not loaded'
+            return
+
+        future = futures.get(script.code)
+        self.document.currentScript = script.element
+        interpreter = None
+        try:
+            ast = parse_cached(script.code, None if future is None else lambda code: future.result())
+            interpreter = JSInterpreter(script.code, exec_ctx=self.ctx, limits=self._remaining_limits())
+            output['result'] = interpreter.evaluate(ast)
+        except ExecutionLimitExceeded as e:
+            output['error'] = f'{type(e).__name__}: {e}'
+            raise
+        except Exception as e:
+            output['error'] = f'{type(e).__name__}: {e}'
+        finally:
+            self.document.currentScript = None
+            if interpreter is not None:
+                self._nodes_used += interpreter.node_count
+
+    def run(self):
+        blocking, deferred, async_ = self.ordered()
+        document = self.document
+        window = self.ctx.window
+
+        pool = None
+        futures = {}
+        if self.parse_workers and len(blocking) + len(deferred) + len(async_) > 1:
+            pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+            futures = self._prefetch(pool, blocking + deferred + async_)
+
+        outputs = []
+        if self.limits is not None and self.limits.max_time is not None:
+            self._deadline = time.monotonic() + self.limits.max_time
+        try:
+            document.readyState = 'loading'
+            for script in blocking:
+                self._execute(script, futures, outputs)
+
+            document.readyState = 'interactive'
+            for script in deferred:
+                self._execute(script, futures, outputs)
+            document.dispatchEvent(Event('DOMContentLoaded', {'bubbles': True}))
+
+            # every async script is already available here, so they run in document order
+            for script in async_:
+                self._execute(script, futures, outputs)
+            document.readyState = 'complete'
+            if window is not None:
+                window._dispatchEvent(Event('load'))
+        except ExecutionLimitExceeded as e:
+            # an exhausted budget ends the page: later scripts and the load events don't run
+            self.exhausted = e
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        return outputs
+
+def run_scripts(ctx, load=None, parse_workers=None, limits=None):
+    return ScriptPipeline(ctx, load, parse_workers, limits).run()
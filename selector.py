@@ -0,0 +1,280 @@
+import re
+from functools import lru_cache
+
+SELECTOR_CACHE_SIZE = 512
+
+_IDENT = r'-?(?:[_a-zA-Z]|[^\x00-\x7f]|\\.)(?:[-\w]|[^\x00-\x7f]|\\.)*'
+_TOKENS = re.compile(r'''
+    (?P<ws>\s*(?P<comb>[>+~,])\s*|\s+)
+  | (?P<universal>\*)
+  | (?P<tag>{ident})
+  | \#(?P<id>(?:[-\w]|[^\x00-\x7f]|\\.)+)
+  | \.(?P<cls>{ident})
+  | \[\s*(?P<attr>{ident})\s*(?:(?P<op>[~|^$*]?=)\s*(?:(?P<quote>["'])(?P<qvalue>(?:\\.|(?!(?P=quote)).)*)(?P=quote)|(?P<value>{ident}|\d+))\s*(?P<flag>[iIsS])?\s*)?\]
+  | ::?(?P<pseudo>{ident})(?P<args>\()?
+'''.format(ident=_IDENT), re.X)
+_NTH = re.compile(r'^(?:(?P<odd>odd)|(?P<even>even)|(?P<a>[-+]?\d*)n\s*(?:(?P<sign>[-+])\s*(?P<b>\d+))?|(?P<only>[-+]?\d+))$', re.I)
+_ESCAPE = re.compile(r'\\(.)')
+
+
+def _unescape(value):
+    return _ESCAPE.sub(r'\1', value)
+
+def _is_element(node):
+    return getattr(node, 'nodeType', None) == 1
+
+def _siblings(element):
+    parent = element.parentNode
+    if parent is None:
+        return [element]
+    return [node for node in parent.childNodes if _is_element(node)]
+
+def _parse_nth(text):
+    match = _NTH.match(text.strip())
+    if match is None:
+        raise SyntaxError(f'Invalid :nth expression: {text!r}')
+    if match['odd']:
+        return 2, 1
+    if match['even']:
+        return 2, 0
+    if match['only'] is not None:
+        return 0, int(match['only'])
+
+    a = match['a']
+    a = 1 if a in ('', '+') else -1 if a == '-' else int(a)
+    b = int(match['b']) if match['b'] else 0
+    return a, -b if match['sign'] == '-' else b
+
+def _nth_matcher(a, b, from_end):
+    def check(element):
+        siblings = _siblings(element)
+        position = (len(siblings) - siblings.index(element)) if from_end else siblings.index(element) + 1
+        if a == 0:
+            return position == b
+        return (position - b) % a == 0 and (position - b) // a >= 0
+    return check
+
+def _attribute_matcher(name, op, value, ignore_case):
+    name = name.lower()
+    if op is None:
+        return lambda element: name in element.attributes
+
+    if ignore_case:
+        value = value.lower()
+
+    def get(element):
+        actual = element.attributes.get(name)
+        if actual is None:
+            return None
+        actual = str(actual)
+        return actual.lower() if ignore_case else actual
+
+    tests = {
+        '=': lambda actual: actual == value,
+        '~=': lambda actual: value in actual.split(),
+        '|=': lambda actual: actual == value or actual.startswith(value + '-'),
+        '^=': lambda actual: bool(value) and actual.startswith(value),
+        '$=': lambda actual: bool(value) and actual.endswith(value),
+        '*=': lambda actual: bool(value) and value in actual,
+    }
+    test = tests[op]
+
+    def check(element):
+        actual = get(element)
+        return actual is not None and test(actual)
+    return check
+
+_PSEUDO_CLASSES = {
+    'first-child': lambda element: _siblings(element)[0] is element,
+    'last-child': lambda element: _siblings(element)[-1] is element,
+    'only-child': lambda element: len(_siblings(element)) == 1,
+    'empty': lambda element: not any(_is_element(node) or getattr(node, 'data', '') for node in element.childNodes),
+    'root': lambda element: not _is_element(element.parentNode) and element.parentNode is not None and element.parentNode.nodeType == 9,
+    'checked': lambda element: 'checked' in element.attributes or 'selected' in element.attributes,
+    'disabled': lambda element: 'disabled' in element.attributes,
+    'enabled': lambda element: 'disabled' not in element.attributes,
+}
+
+class Compound:
+    # one compound selector (`div#id.cls[attr]:pseudo`), the tag/id/class parts are kept apart for index lookups
+    def __init__(self):
+        self.tag = None
+        self.id = None
+        self.classes = []
+        self.checks = []
+
+    def compile(self):
+        checks = list(self.checks)
+        if self.classes:
+            classes = self.classes
+            checks.insert(0, lambda element: all(cls in str(element.attributes.get('class') or '').split() for cls in classes))
+        if self.id is not None:
+            id_value = self.id
+            checks.insert(0, lambda element: element.attributes.get('id') == id_value)
+        if self.tag is not None:
+            tag = self.tag
+            checks.insert(0, lambda element: element.tagName == tag)
+
+        if not checks:
+            return lambda element: True
+        if len(checks) == 1:
+            return checks[0]
+        return lambda element: all(check(element) for check in checks)
+
+class Complex:
+    # compounds joined by combinators, matched right to left starting from the subject
+    def __init__(self, parts):
+        self.parts = parts
+        self.subject = parts[-1][1]
+        self._predicates = [(combinator, compound.compile()) for combinator, compound in parts]
+
+    def hint(self):
+        subject = self.subject
+        if subject.id is not None:
+            return 'id', subject.id
+        if subject.classes:
+            return 'class', subject.classes[0]
+        if subject.tag is not None:
+            return 'tag', subject.tag
+        return None
+
+    def match(self, element):
+        return self._match(element, len(self._predicates) - 1)
+
+    def _match(self, element, position):
+        combinator, predicate = self._predicates[position]
+        if not predicate(element):
+            return False
+        if position == 0:
+            return True
+
+        if combinator == '>':
+            parent = element.parentNode
+            return _is_element(parent) and self._match(parent, position - 1)
+        if combinator == ' ':
+            parent = element.parentNode
+            while _is_element(parent):
+                if self._match(parent, position - 1):
+                    return True
+                parent = parent.parentNode
+            return False
+
+        siblings = _siblings(element)
+        before = siblings[:siblings.index(element)]
+        if combinator == '+':
+            return bool(before) and self._match(before[-1], position - 1)
+        return any(self._match(sibling, position - 1) for sibling in reversed(before))
+
+class Selector:
+    def __init__(self, text, selectors):
+        self.text = text
+        self.selectors = selectors
+
+    def hint(self):
+        # candidates can only be narrowed through an index when there is a single complex selector
+        return self.selectors[0].hint() if len(self.selectors) == 1 else None
+
+    def match(self, element):
+        return _is_element(element) and any(selector.match(element) for selector in self.selectors)
+
+    def __repr__(self):
+        return f'<Selector {self.text!r}>'
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def error(self):
+        return SyntaxError(f"'{self.text}' is not a valid selector")
+
+    def parse_list(self, nested=False):
+        selectors = []
+        parts = []
+        compound = None
+        combinator = None
+
+        while self.pos < len(self.text):
+            if nested and self.text[self.pos] == ')':
+                break
+
+            match = _TOKENS.match(self.text, self.pos)
+            if match is None:
+                raise self.error()
+            self.pos = match.end()
+
+            if match['ws'] is not None:
+                comb = match['comb']
+                if comb is None and (self.pos >= len(self.text) or self.text[self.pos] == ')'):
+                    continue
+                if comb == ',':
+                    if compound is None:
+                        raise self.error()
+                    parts.append((combinator, compound))
+                    selectors.append(Complex(parts))
+                    parts, compound, combinator = [], None, None
+                elif compound is not None:
+                    parts.append((combinator, compound))
+                    compound, combinator = None, comb or ' '
+                elif comb is not None:
+                    if combinator is not None and combinator != ' ' or not parts:
+                        raise self.error()
+                    combinator = comb
+                continue
+
+            if compound is None:
+                compound = Compound()
+            elif match['tag'] or match['universal']:
+                raise self.error()
+
+            if match['tag']:
+                compound.tag = _unescape(match['tag']).upper()
+            elif match['id']:
+                compound.id = _unescape(match['id'])
+            elif match['cls']:
+                compound.classes.append(_unescape(match['cls']))
+            elif match['attr']:
+                value = match['qvalue'] if match['qvalue'] is not None else match['value']
+                compound.checks.append(_attribute_matcher(
+                    _unescape(match['attr']), match['op'], _unescape(value or ''), (match['flag'] or '').lower() == 'i'
+                ))
+            elif match['pseudo']:
+                compound.checks.append(self.parse_pseudo(match['pseudo'].lower(), match['args']))
+
+        if compound is None:
+            raise self.error()
+        parts.append((combinator, compound))
+        selectors.append(Complex(parts))
+        return selectors
+
+    def parse_pseudo(self, name, has_args):
+        if not has_args:
+            if name not in _PSEUDO_CLASSES:
+                raise self.error()
+            return _PSEUDO_CLASSES[name]
+
+        if name in ('not', 'is', 'where', 'matches'):
+            inner = Selector(name, self.parse_list(nested=True))
+            self.expect(')')
+            if name == 'not':
+                return lambda element: not inner.match(element)
+            return inner.match
+
+        if name in ('nth-child', 'nth-last-child'):
+            end = self.text.find(')', self.pos)
+            if end < 0:
+                raise self.error()
+            a, b = _parse_nth(self.text[self.pos:end])
+            self.pos = end + 1
+            return _nth_matcher(a, b, name == 'nth-last-child')
+        raise self.error()
+
+    def expect(self, char):
+        if self.text[self.pos:self.pos + 1] != char:
+            raise self.error()
+        self.pos += 1
+
+@lru_cache(maxsize=SELECTOR_CACHE_SIZE)
+def compile_selector(text):
+    text = str(text).strip()
+    return Selector(text, _Parser(text).parse_list())
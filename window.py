@@ -1,55 +1,34 @@
 import math
 import json
+import bisect
 import queue
 import re
-import os
 import sys
 import types
 import time
-import uuid
-import numpy
 import hashlib
+import functools
 import random
+import itertools
 import threading
+import contextlib
+import collections
 import urllib.parse
 
-import quickjs
-from uaparser import UAParser
 from base64 import b64encode, b64decode
-from document import Document, Event, MouseEvent
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-
-_active_intervals = {}
-_active_timeouts = {}
-_blobs = {}
+from host import HostObject, LazyDict, LazyValue, FrozenDict, OverlayDict, _MISSING, nondeterministic, _running, ExecutionLimitExceeded
+from profiles import BrowserProfile, SCREEM_RESOLUTIONS
+from entropy import (
+    SystemEntropy, SystemClock, RecordingEntropy, RecordingClock, ReplayEntropy, ReplayClock, make_entropy, make_clock
+)
+from document import Document, Event, MouseEvent, EventTarget, MutationObserver, dispatch_event
 
 def _createClass(name):
-    return type(name, (object,), {
+    return type(name, (HostObject,), {
         '__init__': lambda self: None
     })
     
-def _user_agent_data(ua):
-    info = UAParser(ua)
-    
-    return {
-        'bw': info.browser['name'],
-        'version': info.browser['major'],
-        'os': info.os
-    }
-
-LANGUAGE = 'es-ES'
-SCREEM_RESOLUTIONS = (
-    (3440,1440,3440,1400),
-    (1924,1007,1924,1007),
-    (1920,1080,1920,1040),
-    (1280,720,1280,672),
-    (1920,1080,1920,1032),
-    (1366,651,1366,651),
-    (1366,768,1366,738),
-    (1920,1080,1920,1050)
-)
-
-startE = int(time.time() * 1000)
+# csi() and loadTimes() are added per window, they read the window clock
 CHROME_DATA = {
     "app": {
         "InstallState": {
@@ -113,27 +92,6 @@ CHROME_DATA = {
         "sendMessage": lambda: "[native code]",
         "id": None,
     },
-    "csi": lambda: {
-        "startE": startE,
-        "onloadT": startE + 281,
-        "pageT": 3947.235,
-        "tran": 15,
-    },
-    "loadTimes": lambda: {
-        "requestTime": startE / 1000,
-        "startLoadTime": startE / 1000,
-        "commitLoadTime": startE / 1000 + 0.324,
-        "finishDocumentLoadTime": startE / 1000 + 0.498,
-        "finishLoadTime": startE / 1000 + 0.534,
-        "firstPaintTime": startE / 1000 + 0.437,
-        "firstPaintAfterLoadTime": 0,
-        "navigationType": "Other",
-        "wasFetchedViaSpdy": True,
-        "wasNpnNegotiated": True,
-        "npnNegotiatedProtocol": "h3",
-        "wasAlternateProtocolAvailable": False,
-        "connectionInfo": "h3",
-    },
 }
 
 WINDOW_EVENT_HANDLERS = {
@@ -289,6 +247,12 @@ PluginArray = {
     'JavaScript Portable Document Format Plugin': None
 }
 
+def _present(arr):
+    # the iteration methods skip holes
+    if isinstance(arr, JSArray) and arr._holes:
+        return [(i, el) for i, el in enumerate(arr) if not arr.is_hole(i)]
+    return enumerate(arr)
+
 class ObjectPrototypeCall:
     def array_prototype():
         return {
@@ -306,16 +270,16 @@ class ObjectPrototypeCall:
                 if delete_count is not None else arr.__setitem__(slice(start, len(arr)), items)
             )(arr[start:start + delete_count] if delete_count is not None else []),
             'concat': lambda arr, *args: arr + [item for sublist in args for item in (sublist if isinstance(sublist, list) else [sublist])],
-            'indexOf': lambda arr, item, start=0: arr.index(item, start) if item in arr[start:] else -1,
+            'indexOf': lambda arr, item, start=0: next((i for i, el in _present(arr) if i >= start and el == item), -1),
             'includes': lambda arr, item: item in arr,
-            'forEach': lambda arr, callback: [callback(el, i, arr) for i, el in enumerate(arr)],
-            'map': lambda arr, callback: [callback(el, i, arr) for i, el in enumerate(arr)],
-            'filter': lambda arr, callback: [el for i, el in enumerate(arr) if callback(el, i, arr)],
+            'forEach': lambda arr, callback: [callback(el, i, arr) for i, el in _present(arr)],
+            'map': lambda arr, callback: [callback(el, i, arr) if not (isinstance(arr, JSArray) and arr.is_hole(i)) else None for i, el in enumerate(arr)],
+            'filter': lambda arr, callback: [el for i, el in _present(arr) if callback(el, i, arr)],
             'reduce': lambda arr, callback, initial=None: (
-                lambda acc: [acc := callback(acc, el, i, arr) for i, el in enumerate(arr)][-1] if arr else initial
+                lambda acc: [acc := callback(acc, el, i, arr) for i, el in _present(arr)][-1] if arr else initial
             )(initial if initial is not None else arr[0]),
-            'every': lambda arr, callback: all(callback(el, i, arr) for i, el in enumerate(arr)),
-            'some': lambda arr, callback: any(callback(el, i, arr) for i, el in enumerate(arr)),
+            'every': lambda arr, callback: all(callback(el, i, arr) for i, el in _present(arr)),
+            'some': lambda arr, callback: any(callback(el, i, arr) for i, el in _present(arr)),
             'find': lambda arr, callback: next((el for i, el in enumerate(arr) if callback(el, i, arr)), None),
             'findIndex': lambda arr, callback: next((i for i, el in enumerate(arr) if callback(el, i, arr)), -1),
             'toString': lambda arr: ','.join(map(str, arr)),
@@ -342,6 +306,7 @@ class ObjectPrototypeCall:
             'length': lambda s: len(s),
             'charAt': lambda s, i: s[i] if 0 <= i < len(s) else '',
             'charCodeAt': lambda s, i: ord(s[i]) if 0 <= i < len(s) else None,
+            'codePointAt': lambda s, i: ord(s[i]) if 0 <= i < len(s) else None,
             'includes': lambda s, substr, start=0: substr in s[start:],
             'indexOf': lambda s, substr, start=0: s.find(substr, start),
             'lastIndexOf': lambda s, substr: s.rfind(substr),
@@ -352,7 +317,13 @@ class ObjectPrototypeCall:
             'substr': lambda s, start, length=None: s[start:start+length] if length is not None else s[start:],
             'toLowerCase': lambda s: s.lower(),
             'toUpperCase': lambda s: s.upper(),
+            'toLocaleLowerCase': lambda s: s.lower(),
+            'toLocaleUpperCase': lambda s: s.upper(),
             'trim': lambda s: s.strip(),
+            'trimStart': lambda s: s.lstrip(),
+            'trimEnd': lambda s: s.rstrip(),
+            'trimLeft': lambda s: s.lstrip(),
+            'trimRight': lambda s: s.rstrip(),
             'repeat': lambda s, count: s * count,
             'padStart': lambda s, targetLength, padString=' ': s.rjust(targetLength, padString),
             'padEnd': lambda s, targetLength, padString=' ': s.ljust(targetLength, padString),
@@ -360,6 +331,7 @@ class ObjectPrototypeCall:
             'replace': lambda s, pattern, repl: re.sub(pattern, repl, s, count=1),
             'replaceAll': lambda s, pattern, repl: re.sub(pattern, repl, s),
             'match': lambda s, pattern: re.findall(pattern, s),
+            'matchAll': lambda s, pattern: list(re.finditer(pattern, s)),
             'search': lambda s, pattern: (m := re.search(pattern, s)).start() if m else -1,
             'concat': lambda s, *args: s + ''.join(to_py_str(a) for a in args),
             'toString': lambda s: s,
@@ -383,7 +355,7 @@ class ObjectPrototypeCall:
             'valueOf': lambda obj=None, this=None: obj
         }
         
-class JSFunction:
+class JSFunction(HostObject):
     def __init__(self, func):
         self.func = func
         self.props = {}
@@ -393,10 +365,6 @@ class JSFunction:
 
     def call(self, this, *args, **kwargs):
         return self.func(this, *args, **kwargs)
-    
-    def __getitem__(self, key):
-        if key in dir(self):
-            return getattr(self, key)
         
     def __setitem__(self, key, value):
         self.props[key] = value
@@ -412,16 +380,11 @@ class JSPropertyFunc:
         pass
     
 
-class DOMStringList:
+class DOMStringList(HostObject):
     def __init__(self):
         self.length = 0
-        
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
 
-class Location:
+class Location(HostObject):
     def __init__(self, domain):
         self.ancestorOrigins = DOMStringList()
         self.hash = ''
@@ -438,99 +401,49 @@ class Location:
         
         self.protocol = domain.split('//')[0]
         self.search = ''
-        
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
     
-class DevicePosture:
+class DevicePosture(HostObject):
     def __init__(self):
         self.onchange = None
         self.type = 'continuous'
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class WGSLLanguageFeatures:
+class WGSLLanguageFeatures(HostObject):
     def __init__(self):
         self.size = 4
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class GPU:
+class GPU(HostObject):
     def __init__(self):
         self.wgslLanguageFeatures = WGSLLanguageFeatures()
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class HID:
+class HID(HostObject):
     def __init__(self):
         self.onconnect = None
         self.ondisconnect = None
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class NavigatorManagedData:
+class NavigatorManagedData(HostObject):
     def __init__(self):
         self.onmanagedconfigurationchange = None
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class MediaDevices:
+class MediaDevices(HostObject):
     def __init__(self):
         self.ondevicechange = None
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class MediaSession:
+class MediaSession(HostObject):
     def __init__(self):
         self.metadata = None
         self.playbackState = None
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class Presentation:
+class Presentation(HostObject):
     def __init__(self):
         self.defaultRequest = None
         self.receiver = None
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class Serial:
+class Serial(HostObject):
     def __init__(self):
         self.onconnect = None
         self.ondisconnect = None
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class ServiceWorkerContainer:
+class ServiceWorkerContainer(HostObject):
     def __init__(self):
         self.controller = None
         self.oncontrollerchange = None
@@ -538,32 +451,17 @@ class ServiceWorkerContainer:
         self.messageerror = None
         self.ready = lambda: {}
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class USB:
+class USB(HostObject):
     def __init__(self):
         self.onconnect = None
         self.ondisconnect = None
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class UserActivation:
+class UserActivation(HostObject):
     def __init__(self):
         self.hasBeenActive = True
         self.isActive = False
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class DOMRect:
+class DOMRect(HostObject):
     def __init__(self):
         self.button = 0
         self.height = 0
@@ -574,72 +472,45 @@ class DOMRect:
         self.x = 0
         self.y = 0
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class VirtualKeyboard:
+class VirtualKeyboard(HostObject):
     def __init__(self):
         self.boundingRect = DOMRect()
         self.ongeometrychange = None
         self.overlaysContent = False
-        
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
 
-class WindowControlsOverlay:
+class WindowControlsOverlay(HostObject):
     def __init__(self):
         self.ongeometrychange = None
         self.visible = False
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class XRSystem:
+class XRSystem(HostObject):
     def __init__(self):
         self.ondevicechange = None
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class NavigatorUAData:
-    def __init__(self, user_agent):
-        ua_info = _user_agent_data(user_agent)
+class NavigatorUAData(HostObject):
+    def __init__(self, user_agent, profile=None):
+        profile = profile or BrowserProfile.get(user_agent)
         
         self.brands = [
-            {'brand': ua_info['bw'], 'version': ua_info['version']},
-            {'brand': 'Chrome', 'version': ua_info['version']},
+            {'brand': profile.browser, 'version': profile.browser_version},
+            {'brand': 'Chrome', 'version': profile.browser_version},
             {'brand': 'Not.A/Brand', 'version': '99'}
         ]
-        self.mobile = False if 'Android' not in ua_info['os']['name'] else True
-        self.platform = ua_info['os']['name']
-        
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
+        self.mobile = profile.mobile
+        self.platform = profile.os_name
         
-class ScreenOrientation:
+class ScreenOrientation(HostObject):
     def __init__(self):
         self.angle = 0
         self.type = 'landscape-primary'
         self.onchange = None
-        
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
 
-class Screen:
-    def __init__(self):
-        o_height, o_width, i_height, i_width = random.choice(list(SCREEM_RESOLUTIONS))
+class Screen(HostObject):
+    def __init__(self, profile=None):
+        if profile is not None:
+            o_height, o_width, i_height, i_width = profile.screen
+        else:
+            o_height, o_width, i_height, i_width = random.choice(list(SCREEM_RESOLUTIONS))
         self.availHeight = o_height
         self.availLeft = 0
         self.availTop = 0
@@ -651,14 +522,10 @@ class Screen:
         self.orientation = ScreenOrientation()
         self.pixelDepth = 24
         self.width = 2560
-        
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
     
-class Navigator:
-    def __init__(self, user_agent):
+class Navigator(HostObject):
+    def __init__(self, user_agent, profile=None):
+        profile = profile or BrowserProfile.get(user_agent)
         self.appCodeName = 'Mozilla'
         self.appName = 'Netscape'
         self.appVersion = user_agent.lstrip('Mozilla/')
@@ -666,18 +533,18 @@ class Navigator:
         self.clipboard = Clipboard()
         self.cookieEnabled = True
         self.credentials = CredentialsContainer()
-        self.deviceMemory = random.randint(1, 3) << 3
+        self.deviceMemory = profile.device_memory
         self.devicePosture = DevicePosture()
         self.doNotTrack = None
         self.geolocation = Geolocation()
         self.globalPrivacyControl = True
         self.gpu = GPU()
-        self.hardwareConcurrency = random.randint(2, 6)
+        self.hardwareConcurrency = profile.hardware_concurrency
         self.hid = HID()
         self.ink = Ink()
         self.keyboard = None
-        self.language = LANGUAGE
-        self.languages = [LANGUAGE]
+        self.language = profile.language
+        self.languages = list(profile.languages)
         self.locks = LockManager()
         self.managed = NavigatorManagedData()
         self.maxTouchPoints = 0
@@ -688,7 +555,7 @@ class Navigator:
         self.onLine = True
         self.pdfViewerEnabled = True
         self.permissions = Permissions
-        self.platform = 'Win32'
+        self.platform = profile.navigator_platform
         self.plugins = PluginArray
         self.presentation = Presentation()
         self.product = 'Gecko'
@@ -701,7 +568,7 @@ class Navigator:
         self.usb = USB()
         self.userActivation = UserActivation()
         self.userAgent = user_agent
-        self.userAgentData = NavigatorUAData(user_agent)
+        self.userAgentData = NavigatorUAData(user_agent, profile)
         self.vendor = 'Google Inc.'
         self.vendorSUb = ''
         self.virtualKeyboard = VirtualKeyboard()
@@ -712,12 +579,7 @@ class Navigator:
         self.windowControlsOverlay = WindowControlsOverlay()
         self.xr = XRSystem()
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-        
-class JSON:
+class JSON(HostObject):
     def __init__(self):
         self.parse = json.loads
         self.stringify = self._json_dumps_func
@@ -725,13 +587,15 @@ class JSON:
     def _json_dumps_func(self, data):
         return json.dumps(data, separators=(':', ','))
     
-class BarProp:
+class BarProp(HostObject):
     def __init__(self):
         self.visible = True
     
-class Performance:
-    def __init__(self, platform):
+class Performance(HostObject):
+    def __init__(self, platform, profile=None, clock=None):
         self.platform = platform
+        self.profile = profile
+        self._clock = clock or SystemClock()
         
         self.memory = self.pmemory()
         self.eventCounts = {
@@ -742,10 +606,20 @@ class Performance:
             'type': 1
         }
         self.onresourcetimingbufferfull = None
-        self.timeOrigin = float((int(time.time()) * 1000))
+        self.timeOrigin = float(int(self._clock.time_ms('performance.timeOrigin')))
         self.timing = {}
+        
+    def now(self):
+        return self._clock.monotonic_ms('performance.now')
     
     def pmemory(self):
+        if self.profile is not None:
+            return {
+                'jsHeapSizeLimit': self.profile.js_heap_size_limit,
+                'totalJSHeapSize': self.profile.total_js_heap_size,
+                'usedJSHeapSize': self.profile.used_js_heap_size
+            }
+        
         if self.platform == 'Android':
             js_heap_size_limit = 512 * 1024 * 1024
         else:
@@ -759,24 +633,17 @@ class Performance:
             'totalJSHeapSize': total_js_heap_size,
             'usedJSHeapSize': used_js_heap_size
         }
-        
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
 
-class Fetch:
+class Fetch(HostObject):
     def __init__(self, url, headers, body):
         self.url = url
         self.headers = headers
         self.body = body
         
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
+class Crypto(HostObject):
+    def __init__(self, entropy=None):
+        self._entropy = entropy or SystemEntropy()
         
-class Crypto:
     def digest(self, algorithm: str, data: bytes) -> bytes:
         algorithm = algorithm.lower()
         if algorithm == "sha-256":
@@ -790,32 +657,35 @@ class Crypto:
     
     def generate_key(self, algorithm: str, length: int = 256) -> bytes:
         if algorithm.lower() == "aes-gcm":
-            return os.urandom(length // 8)
+            return self._entropy.bytes(length // 8, 'crypto.generate_key')
         else:
             raise NotImplementedError(f"Key generation for {algorithm} not implemented.")
 
     def encrypt(self, key: bytes, plaintext: bytes, associated_data: bytes = b"") -> bytes:
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
         aesgcm = AESGCM(key)
-        nonce = os.urandom(12)
+        nonce = self._entropy.bytes(12, 'crypto.encrypt')
         ciphertext = aesgcm.encrypt(nonce, plaintext, associated_data)
         return nonce + ciphertext
 
     def decrypt(self, key: bytes, data: bytes, associated_data: bytes = b"") -> bytes:
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
         aesgcm = AESGCM(key)
         nonce = data[:12]
         ciphertext = data[12:]
         return aesgcm.decrypt(nonce, ciphertext, associated_data)
     
     def randomUUID(self):
-        return str(uuid.uuid4())
+        return str(self._entropy.uuid4('crypto.randomUUID'))
     
     def getRandomValues(self, array):
-        random_bytes = os.urandom(len(array) * array.itemsize)
+        random_bytes = self._entropy.bytes(len(array) * array.itemsize, 'crypto.getRandomValues')
         array.frombytes(random_bytes)
         return array
     
-class CreateArrayOfBytes:
-    def __init__(self, obj, array_type=numpy.uint8):
+class CreateArrayOfBytes(HostObject):
+    def __init__(self, obj, array_type='uint8'):
+        import numpy
         if isinstance(obj, int):
             self.array = numpy.zeros(obj, dtype=array_type)
         elif isinstance(obj, list):
@@ -826,13 +696,9 @@ class CreateArrayOfBytes:
         return len(self.array)
             
     def __getitem__(self, index):
-        if index in dir(self):
-            index_func = getattr(self, index)
-            
-            if not isinstance(index_func, types.FunctionType):
-                return index_func
-            else:
-                return index_func()
+        value = self._host_get(index, _MISSING)
+        if value is not _MISSING:
+            return value
         return self.array[index]
     
     def __setitem__(self, index, byte):
@@ -900,21 +766,17 @@ RegExp['prototype'] = {
 }
 RegExp['name'] = 'RegExp'
 
-class TextDecoder:
+class TextDecoder(HostObject):
     def __init__(self, encoding='utf-8'):
         self.encode_type = encoding 
     
     def decode(self, encoded):
         string = ''
-        if isinstance(encoded, (numpy.uint8, numpy.uint16, numpy.uint32, list)):
+        numpy = sys.modules.get('numpy')
+        if isinstance(encoded, list) or numpy and isinstance(encoded, (numpy.uint8, numpy.uint16, numpy.uint32)):
             for num in encoded:
                 string += chr(num)
         return string.encode(self.encode_type)
-    
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
 
 Math = {
     'trunc': math.trunc,
@@ -924,11 +786,12 @@ Math = {
     'ceil': math.ceil
 }
     
-class TextEncoder:
+class TextEncoder(HostObject):
     def __init__(self, encoding='utf-8'):
         self.encoding_type = encoding
         
     def encode(self, string):
+        import numpy
         string = string.encode(self.encoding_type)
         uint8_arr = numpy.zeros(len(string), dtype=numpy.uint8)
         
@@ -936,20 +799,89 @@ class TextEncoder:
             uint8_arr[i] = ord(chr)
         return uint8_arr
     
-    def __getitem__(self, key):
-        if key in dir(self):
-            index_func = getattr(self, key)
-            return index_func
-    
+def _densifying(method):
+    def wrapper(self, *args, **kwargs):
+        self._densify()
+        return method(self, *args, **kwargs)
+    return wrapper
+
 class JSArray(list):
+    # methods are looked up on Array.prototype instead of bound per instance, and holes are kept as
+    # sorted [start, end) bounds of index ranges, split or shrunk as they are written and dropped once dense
+    _holes = ()
+    
     def __init__(self, *args):
-        if len(args) == 1 and isinstance(args[0], int):
-            super().__init__([None] * args[0])
+        if len(args) == 1 and isinstance(args[0], (int, float)) and not isinstance(args[0], bool):
+            length = int(args[0])
+            super().__init__([None] * length)
+            if length:
+                self._add_holes(0, length)
         else:
             super().__init__(args)
             
-        for name, func in Array.prototype.items():
-            setattr(self, name, lambda *a, func=func: func.call(self, *a))
+    def __getattr__(self, name):
+        func = _intrinsics()['Array.prototype'].get(name)
+        if func is None:
+            raise AttributeError(name)
+        return functools.partial(func.call, self)
+    
+    def _add_holes(self, start, end):
+        # only ever past the current end
+        if not self._holes:
+            self._holes = [start, end]
+        elif self._holes[-1] == start:
+            self._holes[-1] = end
+        else:
+            self._holes += (start, end)
+            
+    def _fill(self, index):
+        holes = self._holes
+        position = bisect.bisect_right(holes, index)
+        if not position & 1:
+            return
+        start, end = holes[position - 1], holes[position]
+        split = []
+        if start < index:
+            split += (start, index)
+        if index + 1 < end:
+            split += (index + 1, end)
+        holes[position - 1:position + 1] = split
+        if not holes:
+            self._holes = ()
+            
+    def _densify(self):
+        # once elements move the remaining holes just read as undefined
+        self._holes = ()
+        
+    def is_hole(self, index):
+        if not self._holes or not 0 <= index < len(self):
+            return False
+        return bisect.bisect_right(self._holes, index) & 1 == 1
+    
+    def __setitem__(self, index, value):
+        if type(index) is int:
+            size = len(self)
+            if index >= size:
+                if index > size:
+                    self._add_holes(size, index)
+                list.extend(self, [None] * (index - size + 1))
+            elif self._holes:
+                self._fill(index if index >= 0 else index + size)
+        elif self._holes:
+            self._densify()
+        list.__setitem__(self, index, value)
+        
+    def pop(self, index=-1):
+        if self._holes and index not in (-1, len(self) - 1):
+            self._densify()
+        return list.pop(self, index)
+    
+    insert = _densifying(list.insert)
+    remove = _densifying(list.remove)
+    sort = _densifying(list.sort)
+    reverse = _densifying(list.reverse)
+    clear = _densifying(list.clear)
+    __delitem__ = _densifying(list.__delitem__)
 
     def __repr__(self):
         return f'{super().__repr__()}'
@@ -959,17 +891,24 @@ class _ArrayMeta(type):
     def __getattr__(cls, name):
         if name == 'from':
             return lambda obj: JSArray(*list(obj))
+        if name == 'prototype':
+            return _intrinsics()['Array.prototype']
+        raise AttributeError(name)
+    
+    def __getitem__(cls, key):
+        return getattr(cls, key, None)
 
 
 class Array(metaclass=_ArrayMeta):
-    prototype = {k: JSFunction(v) for k, v in ObjectPrototypeCall.array_prototype().items()}
-
     def __new__(cls, *args):
         return JSArray(*args)
 
 
-class String:
+class String(HostObject):
     constructor = None
+    def __init__(self, prototype=None):
+        self.prototype = prototype if prototype is not None else Realm.shared().overlay()['String.prototype']
+        
     def __call__(self, value=''):
         return str(value)
     
@@ -982,14 +921,6 @@ class String:
             for arg in args:
                 string += chr(arg)
         return string
-    
-    @property
-    def prototype(self):
-        return {k: JSFunction(v) for k, v in ObjectPrototypeCall.string_prototype().items()}
-    
-    def __getitem__(self, key):
-        if key in dir(self):
-            return getattr(self, key)
   
 class _ObjectProto:
     def assign(target, *sources):
@@ -1014,12 +945,70 @@ Object = {
     'getOwnPropertyNames': _ObjectProto.get_own_property_names
 }
 
+def _freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, JSFunction):
+        func = JSFunction(value.func)
+        func.props = _freeze(value.props)
+        return func
+    return value
+
+def _thaw(value):
+    if isinstance(value, FrozenDict):
+        return OverlayDict(value, _thaw)
+    if isinstance(value, JSFunction) and isinstance(value.props, FrozenDict):
+        func = JSFunction(value.func)
+        func.props = OverlayDict(value.props, _thaw)
+        return func
+    return value
+
+class Realm:
+    # intrinsics are built and frozen once per process, every window reads them
+    # through its own copy-on-write overlay so script changes stay in that window
+    _shared = None
+    _lock = threading.Lock()
+    
+    def __init__(self):
+        self.intrinsics = _freeze({
+            'Object': Object,
+            'Math': Math,
+            'RegExp': RegExp,
+            'chrome': CHROME_DATA,
+            'Array.prototype': {k: JSFunction(v) for k, v in ObjectPrototypeCall.array_prototype().items()},
+            'String.prototype': {k: JSFunction(v) for k, v in ObjectPrototypeCall.string_prototype().items()}
+        })
+        
+    @classmethod
+    def shared(cls):
+        if cls._shared is None:
+            with cls._lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+    
+    def overlay(self):
+        return OverlayDict(self.intrinsics, _thaw)
+
+def _intrinsics():
+    # Array is one class for every window, its prototype comes from the realm of the window running the script
+    interpreter = getattr(_running, 'interpreter', None)
+    window = interpreter.call_stack[0].window if interpreter is not None else None
+    if window is None:
+        return Realm.shared().intrinsics
+    return window.intrinsics
+
     
-class Date:
-    def now():
-        return int(time.time()) * 1000
+class Date(HostObject):
+    def __init__(self, clock=None):
+        self._clock = clock or SystemClock()
+        
+    def now(self):
+        return int(self._clock.time_ms('Date.now'))
     
-class Blob:
+class Blob(HostObject):
     def __init__(self, parts, options=None):
         self.parts = parts
         self.type = options.get('type') if options else ''
@@ -1033,7 +1022,7 @@ class Blob:
     def toURL(self):
         return self.text()
 
-class MessageEvent:
+class MessageEvent(HostObject):
     def __init__(self, type_, data=None, origin='', source=None, last_event_id='', ports=None):
         self.type = type_
         self.data = data
@@ -1046,8 +1035,10 @@ class MessageEvent:
         return f"<MessageEvent type='{self.type}' data={self.data}>"
 
 
-class Worker:
-    def __init__(self, blob_or_path):
+class Worker(HostObject):
+    def __init__(self, blob_or_path, task=None, worker_id=0):
+        self._task = task
+        self._worker_id = worker_id
         self._event_listeners = {'message': [], 'error': []}
         self._in_queue = queue.Queue()
         self._out_queue = queue.Queue()
@@ -1060,6 +1051,7 @@ class Worker:
         else:
             raise TypeError('Expected Blob or path')
 
+        import quickjs
         self.ctx = quickjs.Context()
         self.ctx.add_callable("_postMessage", self._from_worker_post)
 
@@ -1121,16 +1113,17 @@ class Worker:
             event = self._out_queue.get()
             if event is None:
                 break
-            self._emit('message', event)
+            if self._task is None:
+                self._emit('message', event)
+                continue
+            with self._task('message', self._worker_id, event.data) as data:
+                event.data = data
+                self._emit('message', event)
 
     def terminate(self):
         self._in_queue.put(None)
         self._out_queue.put(None)
         self.thread.join()
-        
-    def __getitem__(self, key):
-        if key in dir(self):
-            return getattr(self, key)
 
         
 LocalStorageInit = {}
@@ -1138,40 +1131,81 @@ sessionStorageInit = {}
 EventInit = None
 
 class Window:
-    def __init__(self, domain, user_agent, html=''):
+    def __init__(self, domain, user_agent=None, html='', profile=None, seed=None, record=None, replay=None, parser=None):
+        if replay is not None:
+            profile = replay.profile
+        elif profile is None:
+            profile = BrowserProfile.get(user_agent, seed)
+            
+        # with a seed every entropy and time source is reproducible
+        self.seed = seed
+        self.entropy = make_entropy(seed)
+        self.clock = make_clock(seed)
+        self.trace = None
+        
+        # a recorded trace replays the values an earlier run got, timers and worker messages keep their order
+        if replay is not None:
+            self.trace = replay.start_replay()
+            self.entropy = ReplayEntropy(self.trace)
+            self.clock = ReplayClock(self.trace)
+        elif record is not None:
+            self.trace = record.start_recording(profile, domain, seed)
+            self.entropy = RecordingEntropy(self.entropy, self.trace)
+            self.clock = RecordingClock(self.clock, self.trace)
+            
         self.domain = domain
-        self.user_Agent = user_agent
+        self.user_Agent = user_agent or profile.user_agent
+        self.profile = profile
         self._html_code = html
-        self.platform = 'Windows'
-        self.pixels_ratio = random.uniform(0.9, 1.9)
-        self.o_height, self.o_width, self.i_height, self.i_width = random.choice(list(SCREEM_RESOLUTIONS))
+        self.parser = parser
+        self.platform = profile.platform
+        self.pixels_ratio = profile.device_pixel_ratio
+        self.o_height, self.o_width, self.i_height, self.i_width = profile.screen
         
         self._event_listeners = {}
-        self.on_handlers = {}
+        self._on_handlers = {}
+        self._microtasks = collections.deque()
+        self._in_microtasks = False
+        self._pending_observers = []
         self.activeElement = None
+        self._timer_ids = itertools.count(1)
+        self._worker_ids = itertools.count(1)
+        self._active_intervals = {}
+        self._active_timeouts = {}
+        self.timer_errors = []
+        self._task_lock = threading.RLock()
+        self._task_state = threading.local()
+        self._script_ids = itertools.count(1)
+        self.realm = Realm.shared()
+        self.intrinsics = self.realm.overlay()
+        self.intrinsics['Math']['random'] = self.entropy.random
+        self.intrinsics['chrome']['csi'] = self._chrome_csi
+        self.intrinsics['chrome']['loadTimes'] = self._chrome_load_times
+        self._navigation_start_ms = None
         self._init_env()
         
     def _init_env(self):
-        self.env = {
-            'chrome': CHROME_DATA,
-            'clearInterval': clearInterval,
-            'clearTimeout': clearTimeout,
+        self.env = LazyDict({
+            'chrome': self.intrinsics['chrome'],
+            'clearInterval': self._clear_interval,
+            'clearTimeout': self._clear_timeout,
             'closed': False,
-            'clientInformation': Navigator(self.user_Agent),
-            'crypto': Crypto(),
+            'clientInformation': LazyValue(self._client_information),
+            'crypto': LazyValue(self._crypto),
+            'Date': LazyValue(self._date),
             'atob': self._atob_func,
             'btoa': self._btoa_func,
             'isSecureContext': True,
             'innerHeight': self.i_height,
             'innerWidth': self.i_width,
-            'location': Location(self.domain),
-            'locationbar': BarProp(),
+            'location': LazyValue(self._location),
+            'locationbar': LazyValue(BarProp),
             'length': 0,
             'name': '',
-            'localStorage': LocalStorageInit,
-            'sessionStorage': sessionStorageInit,
-            'screen': Screen,
-            'navigator': Navigator(self.user_Agent),
+            'localStorage': dict(LocalStorageInit),
+            'sessionStorage': dict(sessionStorageInit),
+            'screen': LazyValue(self._screen),
+            'navigator': LazyValue(self._navigator),
             'devicePixelRatio': self.pixels_ratio,
             'outerHeight': self.o_width,
             'outerWidth': self.o_height,
@@ -1179,12 +1213,12 @@ class Window:
             'pageXOffset': 0,
             'pageYOffset': 0,
             'event': EventInit,
-            'performance': Performance(self.platform),
+            'performance': LazyValue(self._performance),
             'fetch': Fetch,
             'scrollX': 0,
             'scrollY': 0,
-            'indexedDB': IDBFactory(),
-            'String': String(),
+            'indexedDB': LazyValue(IDBFactory),
+            'String': LazyValue(self._string),
             'Number': {
                 'EPSILON': 2.220446049250313e-16,
                 'MAX_SAFE_INTEGER': 9007199254740991,
@@ -1201,19 +1235,19 @@ class Window:
                 'parseFloat': self.parse_float,
                 'parseInt': self.parse_int
             },
-            'Object': Object,
+            'Object': self.intrinsics['Object'],
             'decodeURI': self.decode_url_component,
             'decodeURIComponent': self.decode_url_component,
             'encodeURI': self.encode_url,
             'encodeURIComponent': self.encode_url_component,
-            'statusbar': BarProp(),
-            'scrollbars': BarProp(),
-            'setInterval': SetInterval,
-            'setTimeout': SetTimeout,
+            'statusbar': LazyValue(BarProp),
+            'scrollbars': LazyValue(BarProp),
+            'setInterval': self._set_interval,
+            'setTimeout': self._set_timeout,
             'TextDecoder': TextDecoder,
             'TextEncoder': TextEncoder,
-            'Math': Math,
-            'USB': USB(),
+            'Math': self.intrinsics['Math'],
+            'USB': LazyValue(USB),
             'console': {
                 'log': print,
                 'warn': print,
@@ -1221,18 +1255,18 @@ class Window:
                 'dir': print,
                 'error': print
             },
-            'Uint8Array': lambda obj: CreateArrayOfBytes(obj, array_type=numpy.uint8),
-            'Uint16Array': lambda obj: CreateArrayOfBytes(obj, array_type=numpy.uint16),
-            'Uint32Array': lambda obj: CreateArrayOfBytes(obj, array_type=numpy.uint32),
-            'Int8Array': lambda obj: CreateArrayOfBytes(obj, array_type=numpy.int8),
-            'Int16Array': lambda obj: CreateArrayOfBytes(obj, array_type=numpy.int16),
-            'Int32Array': lambda obj: CreateArrayOfBytes(obj, array_type=numpy.int32),
-            'RegExp': RegExp,
+            'Uint8Array': lambda obj: CreateArrayOfBytes(obj, array_type='uint8'),
+            'Uint16Array': lambda obj: CreateArrayOfBytes(obj, array_type='uint16'),
+            'Uint32Array': lambda obj: CreateArrayOfBytes(obj, array_type='uint32'),
+            'Int8Array': lambda obj: CreateArrayOfBytes(obj, array_type='int8'),
+            'Int16Array': lambda obj: CreateArrayOfBytes(obj, array_type='int16'),
+            'Int32Array': lambda obj: CreateArrayOfBytes(obj, array_type='int32'),
+            'RegExp': self.intrinsics['RegExp'],
             'NaN': math.nan,
-            'Array': lambda obj: Array(obj),
-            'Float16Array': lambda obj: CreateArrayOfBytes(obj, array_type=numpy.float16),
-            'Float32Array': lambda obj: CreateArrayOfBytes(obj, array_type=numpy.float32),
-            'Float64Array': lambda obj: CreateArrayOfBytes(obj, array_type=numpy.float64),
+            'Array': Array,
+            'Float16Array': lambda obj: CreateArrayOfBytes(obj, array_type='float16'),
+            'Float32Array': lambda obj: CreateArrayOfBytes(obj, array_type='float32'),
+            'Float64Array': lambda obj: CreateArrayOfBytes(obj, array_type='float64'),
             'escape': self.escape,
             'eval': eval,
             'parseInt': self.parse_int,
@@ -1246,41 +1280,208 @@ class Window:
             'Window': Window,
             'PluginArray': PluginArray,
             'Bluetooth': Bluetooth,
-            'requestIdleCallback': requestIdleCallback,
+            'requestIdleCallback': self._request_idle_callback,
             'cancelIdleCallback': cancelIdleCallback,
             'addEventListener': self._addEventListener,
             'removeEventListener': self._removeEventListener,
             'dispatchEvent': self._dispatchEvent,
             'trigger_event': self.trigger_event,
+            'queueMicrotask': self._queue_microtask,
+            'MutationObserver': self._mutation_observer,
             'Blob': Blob,
-            'Worker': Worker,
+            'Worker': self._worker,
             **WINDOW_EVENT_HANDLERS
-        }
-        self.env.update({
-            'document': Document(self.env, self.domain, self._html_code),
         })
-        self.env = {
-            'window': self.env, 
-            'globalThis': self.env, 
+        self.env.update({
+            'document': LazyValue(self._document),
+            'window': self.env,
+            'globalThis': self.env,
             'self': self.env,
-            'parent': self.env,
-            **self.env
+            'parent': self.env
+        })
+        
+    def _navigator(self):
+        return Navigator(self.user_Agent, self.profile)
+    
+    def _client_information(self):
+        return self.env['navigator']
+    
+    def _location(self):
+        return Location(self.domain)
+    
+    def _performance(self):
+        return Performance(self.platform, self.profile, self.clock)
+    
+    def _crypto(self):
+        return Crypto(self.entropy)
+    
+    def _date(self):
+        return Date(self.clock)
+    
+    def _worker(self, blob_or_path):
+        return Worker(blob_or_path, self.task, next(self._worker_ids))
+    
+    def _screen(self):
+        return Screen(self.profile)
+    
+    def _string(self):
+        return String(self.intrinsics['String.prototype'])
+    
+    def _navigation_start(self, api):
+        # read from the window clock the first time a script asks, seeded and replayed runs get the same value
+        if self._navigation_start_ms is None:
+            self._navigation_start_ms = int(self.clock.time_ms(api))
+        return self._navigation_start_ms
+    
+    def _chrome_csi(self):
+        start = self._navigation_start('chrome.csi')
+        return {
+            "startE": start,
+            "onloadT": start + 281,
+            "pageT": 3947.235,
+            "tran": 15,
         }
+    
+    def _chrome_load_times(self):
+        start = self._navigation_start('chrome.loadTimes') / 1000
+        return {
+            "requestTime": start,
+            "startLoadTime": start,
+            "commitLoadTime": start + 0.324,
+            "finishDocumentLoadTime": start + 0.498,
+            "finishLoadTime": start + 0.534,
+            "firstPaintTime": start + 0.437,
+            "firstPaintAfterLoadTime": 0,
+            "navigationType": "Other",
+            "wasFetchedViaSpdy": True,
+            "wasNpnNegotiated": True,
+            "npnNegotiatedProtocol": "h3",
+            "wasAlternateProtocolAvailable": False,
+            "connectionInfo": "h3",
+        }
+    
+    def _document(self):
+        return Document(self.env, self.domain, self._html_code, parser=self.parser, view=self)
+        
+    def _request_idle_callback(self, callback, timeout=None):
+        nondeterministic('requestIdleCallback')
+        clock = self.clock
+        def wrapper():
+            start = clock.monotonic_ms('requestIdleCallback')
+            deadline = {
+                'didTimeout': False,
+                'timeRemaining': lambda: max(0, 50 - (clock.monotonic_ms('requestIdleCallback') - start))
+            }
+            task(deadline)
+        task = self._timer_task(callback, 'idle', next(self._timer_ids))
+        timer = threading.Timer(0.001, wrapper)
+        timer.start()
+        return timer
+        
+    def _set_interval(self, func, delay_ms=0):
+        nondeterministic('setInterval')
+        timer_id = next(self._timer_ids)
+        return SetInterval(self._timer_task(func, 'timer', timer_id), delay_ms, timer_id, self._active_intervals, self._timer_error).id
+    
+    def _set_timeout(self, func, delay_ms=0):
+        nondeterministic('setTimeout')
+        timer_id = next(self._timer_ids)
+        return SetTimeout(self._timer_task(func, 'timer', timer_id), delay_ms, timer_id, self._active_timeouts, self._timer_error).id
+    
+    def _timer_task(self, func, kind, key):
+        # the callback runs later on a thread of its own, on an interpreter forked from the one scheduling it
+        owner = getattr(_running, 'interpreter', None)
+        interpreter = owner.fork() if owner is not None else None
+        
+        def task(*args):
+            with self.task(kind, key):
+                if interpreter is not None:
+                    return interpreter.call_function(func, args)
+                result = func(*args)
+                self.perform_microtask_checkpoint()
+                return result
+        return task
+    
+    @contextlib.contextmanager
+    def task(self, kind, key=None, value=None):
+        # scripts, timer callbacks and worker messages take turns on the window like tasks of one event loop;
+        # the trace keeps the order they ran in, so a replay hands out clock and random values in the same order
+        state = self._task_state
+        if getattr(state, 'active', False):
+            yield value
+            return
+        if key is None:
+            key = next(self._script_ids)
+            
+        trace = self.trace
+        if trace is not None:
+            trace.wait_turn(kind, key)
+        with self._task_lock:
+            if trace is not None:
+                value = trace.take_turn(kind, key, value)
+            state.active = True
+            try:
+                yield value
+            finally:
+                state.active = False
+    
+    def _timer_error(self, timer_id, error):
+        # callbacks run on their own thread after the script returned, a limit they hit is kept here
+        self.timer_errors.append({'timer': timer_id, 'error': f'{type(error).__name__}: {error}', 'stats': error.stats})
+        
+    def _clear_interval(self, interval_id):
+        interval = self._active_intervals.get(interval_id)
+        if interval:
+            interval.stop()
+            
+    def _clear_timeout(self, timeout_id):
+        timeout = self._active_timeouts.get(timeout_id)
+        if timeout:
+            timeout.cancel()
         
-    def _addEventListener(self, event_type, callback):
-        self._event_listeners.setdefault(event_type, []).append(callback)
+    def _addEventListener(self, event_type, callback, options=None):
+        EventTarget.addEventListener(self, event_type, callback, options)
 
-    def _removeEventListener(self, event_type, callback):
-        if event_type in self._event_listeners:
-            self._event_listeners[event_type].remove(callback)
+    def _removeEventListener(self, event_type, callback, options=None):
+        EventTarget.removeEventListener(self, event_type, callback, options)
             
     def _dispatchEvent(self, event):
-        for callback in self._event_listeners.get(event.type, []):
-            callback(event)
+        return dispatch_event(self, event)
+    
+    def _event_parent(self, event):
+        return None
+    
+    def _queue_microtask(self, callback):
+        self._microtasks.append(callback)
+        
+    def perform_microtask_checkpoint(self):
+        if self._in_microtasks:
+            return
+        self._in_microtasks = True
+        try:
+            while self._microtasks:
+                self._microtasks.popleft()()
+        finally:
+            self._in_microtasks = False
             
-        handler = self._on_handlers.get(f'on{event.type}')
-        if callable(handler):
-            handler(event)
+    def _mutation_observer(self, callback):
+        return MutationObserver(callback, self)
+    
+    def _notify_mutation_observer(self, observer):
+        # every observer with new records in this turn is served by the same microtask
+        if not self._pending_observers:
+            self._queue_microtask(self._deliver_mutations)
+        self._pending_observers.append(observer)
+        
+    def _deliver_mutations(self):
+        observers, self._pending_observers = self._pending_observers, []
+        for observer in observers:
+            observer._deliver()
+    
+    def _event_handler(self, event_type):
+        # handlers assigned from python land on the window, from scripts on the global object
+        name = f'on{event_type}'
+        return self._on_handlers.get(name) or self.env.get(name)
             
     def trigger_event(self, event_type, event=None):
         if not event:
@@ -1377,74 +1578,58 @@ class Window:
         raise AttributeError(f"'Window' object has no attribute '{name}'")
     
 class SetInterval:
-    _next_id = 0
-
-    def __init__(self, func, delay_ms):
+    def __init__(self, func, delay_ms, timer_id, registry, on_error=None):
         self.func = func
         self.delay = delay_ms / 1000.0
         self.running = True
-        self.id = SetInterval._next_id
-        SetInterval._next_id += 1
-        _active_intervals[self.id] = self
+        self.id = timer_id
+        self._on_error = on_error
+        self._registry = registry
+        self._registry[self.id] = self
         threading.Thread(target=self._run, daemon=True).start()
 
     def _run(self):
         while self.running:
             time.sleep(self.delay)
             if self.running:
-                self.func()
+                try:
+                    self.func()
+                except ExecutionLimitExceeded as e:
+                    # an interval that blew its limit once would keep doing so
+                    self.stop()
+                    if self._on_error is not None:
+                        self._on_error(self.id, e)
 
     def stop(self):
         self.running = False
-        _active_intervals.pop(self.id, None)
+        self._registry.pop(self.id, None)
             
 class SetTimeout:
-    _next_id = 0
-
-    def __init__(self, func, delay_ms):
+    def __init__(self, func, delay_ms, timer_id, registry, on_error=None):
         self.func = func
         self.delay = delay_ms / 1000.0
         self.cancelled = False
-        self.id = SetTimeout._next_id
-        SetTimeout._next_id += 1
-        _active_timeouts[self.id] = self
+        self.id = timer_id
+        self._on_error = on_error
+        self._registry = registry
+        self._registry[self.id] = self
         self.thread = threading.Thread(target=self._run, daemon=True)
         self.thread.start()
 
     def _run(self):
         time.sleep(self.delay)
         if not self.cancelled:
-            self.func()
-        _active_timeouts.pop(self.id, None)
+            try:
+                self.func()
+            except ExecutionLimitExceeded as e:
+                if self._on_error is not None:
+                    self._on_error(self.id, e)
+        self._registry.pop(self.id, None)
 
     def cancel(self):
         self.cancelled = True
-        _active_timeouts.pop(self.id, None)
-        
-def clearInterval(interval_id):
-    interval = _active_intervals[interval_id]
-    if interval:
-        interval.stop()
+        self._registry.pop(self.id, None)
         
-def clearTimeout(timeout_id):
-    timeout = _active_timeouts[timeout_id]
-    if timeout:
-        timeout.cancel()
-        
-def requestIdleCallback(callback, timeout=None):
-    def wrapper():
-        start = time.time()
-        
-        deadline = {
-            'didTimeout': False,
-            'timeRemaining': lambda: max(0, 50 - (time.time() - start) * 1000)
-        }
-        callback(deadline)
-    delay = 0.001
-    timer = threading.Timer(delay, wrapper)
-    timer.start()
-    return time
-
 def cancelIdleCallback(timer):
     timer.cancel()
     